@@ -1,3 +1,7 @@
+import time
+
+_START_TIME = time.perf_counter()
+
 import asyncio
 import argparse
 import logging
@@ -7,14 +11,14 @@ from logging.handlers import TimedRotatingFileHandler
 from os import environ
 from pathlib import Path
 
-import seaborn as sns
 from discord.ext import commands
-from matplotlib import pyplot as plt
 
 from tle import constants
 from tle.util import font_downloader
 from tle.util import codeforces_common as cf_common
 from tle.util import discord_common
+from tle.util import graph_common as gc
+from tle.util import lazy
 
 
 def setup():
@@ -36,20 +40,17 @@ def setup():
         ],
     )
 
-    # matplotlib and seaborn
-    plt.rcParams["figure.figsize"] = 7.0, 3.5
-    sns.set()
-    options = {
-        "axes.edgecolor": "#A0A0C5",
-        "axes.spines.top": False,
-        "axes.spines.right": False,
-    }
-    sns.set_style("darkgrid", options)
-
     # Download fonts if necessary
     font_downloader.maybe_download()
 
 
+async def warm_up():
+    # The plotting and imaging libraries are imported on first use, unless
+    # this gets to them first.
+    await gc.warm_up()
+    await lazy.warm_up()
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--nodb", action="store_true")
@@ -78,6 +79,8 @@ def main():
         if extension != "tournament":
             bot.load_extension(f"tle.cogs.{extension}")
     logging.info(f'Cogs loaded: {", ".join(bot.cogs)}')
+    elapsed = time.perf_counter() - _START_TIME
+    logging.info(f"Started in {elapsed:.2f}s")
 
     @bot.command(brief="Starts a tournament")
     @commands.has_any_role("Admin", "Moderator")
@@ -101,8 +104,11 @@ def main():
 
     @bot.event
     async def on_ready():
+        elapsed = time.perf_counter() - _START_TIME
+        logging.info(f"Connected {elapsed:.2f}s after start")
         await cf_common.initialize(args.nodb)
         asyncio.create_task(discord_common.presence(bot))
+        asyncio.create_task(warm_up())
 
     bot.add_listener(discord_common.bot_error_handler, name="on_command_error")
 
@@ -0,0 +1,78 @@
+"""Compares the per-plot latency of saving a figure through a temporary file,
+as plots used to be sent, with saving it straight into a reused buffer. Run
+from the repository root.
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, ".")
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import numpy as np
+from matplotlib.figure import Figure
+
+from tle.util import graph_common as gc
+
+POINTS = 2000
+RUNS = 20
+
+
+def make_figure():
+    fig = Figure()
+    ax = fig.add_subplot()
+    rng = np.random.default_rng(0)
+    x = np.arange(POINTS)
+    ax.plot(x, 1500 + np.cumsum(rng.normal(0, 30, POINTS)), marker="o")
+    ax.set_xlabel("Contest")
+    ax.set_ylabel("Rating")
+    return fig
+
+
+def save_via_temp_file(fig, directory):
+    filename = os.path.join(directory, f"tempplot_{time.time()}.png")
+    fig.savefig(filename, facecolor=fig.axes[0].get_facecolor())
+    with open(filename, "rb") as file:
+        data = io.BytesIO(file.read())
+    os.remove(filename)
+    return data.getvalue()
+
+
+def save_to_buffer(fig):
+    gc._buffer.seek(0)
+    gc._buffer.truncate()
+    fig.savefig(
+        gc._buffer,
+        format="png",
+        dpi=gc.PNG_DPI,
+        facecolor=fig.axes[0].get_facecolor(),
+        pil_kwargs={"compress_level": gc.PNG_COMPRESS_LEVEL},
+    )
+    return gc._buffer.getvalue()
+
+
+def best_time(save, *args):
+    best = float("inf")
+    for _ in range(RUNS):
+        fig = make_figure()
+        begin = time.perf_counter()
+        png = save(fig, *args)
+        best = min(best, time.perf_counter() - begin)
+    return best, len(png)
+
+
+print(f"Line plot of {POINTS} points, best of {RUNS} runs")
+with tempfile.TemporaryDirectory() as directory:
+    old_time, old_size = best_time(save_via_temp_file, directory)
+print(f"{'temp file':<10} {old_time * 1000:7.1f}ms {old_size / 1024:7.1f}KiB")
+new_time, new_size = best_time(save_to_buffer)
+print(
+    f"{'buffer':<10} {new_time * 1000:7.1f}ms {new_size / 1024:7.1f}KiB"
+    f"  saves {(old_time - new_time) * 1000:.1f}ms"
+)
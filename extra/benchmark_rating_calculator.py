@@ -0,0 +1,49 @@
+"""Compares the running time of the rating calculators on random standings of
+the size of a large Div. 2 round, and checks that they agree on all deltas.
+Run from the repository root.
+"""
+
+import random
+import sys
+import time
+
+sys.path.insert(0, ".")
+
+from tle.util.ranklist.rating_calculator import (
+    CodeforcesRatingCalculator,
+    VectorizedRatingCalculator,
+)
+
+CONTESTANTS = 30000
+RUNS = 3
+
+
+def make_standings(n):
+    standings = []
+    for i in range(n):
+        solved = random.randint(0, 7)
+        points = solved + random.choice([0, 0.5])
+        penalty = random.randint(0, 300) * solved
+        rating = max(0, int(random.gauss(1400, 350)))
+        standings.append((f"handle{i}", points, penalty, rating))
+    return standings
+
+
+def best_time(calculator_cls, standings):
+    best = float("inf")
+    for _ in range(RUNS):
+        begin = time.perf_counter()
+        deltas = calculator_cls(standings).calculate_rating_changes()
+        best = min(best, time.perf_counter() - begin)
+    return best, deltas
+
+
+standings = make_standings(CONTESTANTS)
+print(f"{CONTESTANTS} contestants, best of {RUNS} runs")
+old_time, old_deltas = best_time(CodeforcesRatingCalculator, standings)
+print(f"CodeforcesRatingCalculator: {old_time:.3f}s")
+new_time, new_deltas = best_time(VectorizedRatingCalculator, standings)
+print(f"VectorizedRatingCalculator: {new_time:.3f}s")
+print(f"Speedup: {old_time / new_time:.1f}x")
+assert old_deltas == new_deltas, "Calculators disagree on deltas"
+print("Deltas are identical")
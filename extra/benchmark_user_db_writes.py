@@ -0,0 +1,71 @@
+"""Compares caching the Codeforces users of a guild one commit per user, as
+rank updates used to, with caching them in one bulk upsert. Prints the number
+of commits and the time per refresh. Run from the repository root, optionally
+with the number of members and the directory of the database to write.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, ".")
+
+from tle.util import codeforces_api as cf
+from tle.util import db
+
+MEMBERS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+DIRECTORY = sys.argv[2] if len(sys.argv) > 2 else None
+
+
+def make_users(refresh):
+    return [
+        cf.User(
+            f"handle{i}",
+            "First",
+            "Last",
+            "India",
+            "City",
+            "Organization",
+            0,
+            1200 + (i * 7 + refresh) % 2000,
+            int(time.time()),
+            1500000000,
+            i % 100,
+            "//userpic.codeforces.org/no-title.jpg",
+        )
+        for i in range(MEMBERS)
+    ]
+
+
+def commit_count():
+    stats = db.query_stats().get("UserDbConn.commit")
+    return stats.calls if stats else 0
+
+
+def one_by_one(conn, users):
+    for user in users:
+        conn.cache_cf_user(user)
+
+
+def bulk(conn, users):
+    conn.cache_cf_users(users)
+
+
+def refresh(conn, cache, refresh_number):
+    users = make_users(refresh_number)
+    commits = commit_count()
+    begin = time.perf_counter()
+    cache(conn, users)
+    return time.perf_counter() - begin, commit_count() - commits
+
+
+print(f"Refresh of {MEMBERS} members")
+with tempfile.TemporaryDirectory(dir=DIRECTORY) as directory:
+    conn = db.UserDbConn(os.path.join(directory, "user.db"))
+    for number, cache in enumerate((one_by_one, bulk)):
+        elapsed, commits = refresh(conn, cache, number)
+        print(
+            f"{cache.__name__:<11} {commits:5} commits {elapsed * 1000:9.1f}ms"
+        )
+    conn.close()
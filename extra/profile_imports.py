@@ -0,0 +1,45 @@
+"""Reports the modules that take longest to import when the bot starts, from
+the output of `python -X importtime`. Pass the names of modules to import
+instead of the bot and its cogs, e.g. tle.cogs.graphs. Run from the repository
+root.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+TOP = 25
+
+if len(sys.argv) > 1:
+    modules = sys.argv[1:]
+else:
+    cogs = sorted(file.stem for file in Path("tle", "cogs").glob("*.py"))
+    modules = ["discord.ext.commands"] + [
+        f"tle.cogs.{cog}" for cog in cogs if cog != "tournament"
+    ]
+
+code = "\n".join(
+    f"try:\n    import {module}\nexcept ImportError as e:\n    print(e)"
+    for module in modules
+)
+result = subprocess.run(
+    [sys.executable, "-X", "importtime", "-c", code],
+    capture_output=True,
+    text=True,
+)
+print(result.stdout, end="")
+
+# Lines look like "import time: self [us] | cumulative | imported package",
+# where the package is indented by its nesting depth.
+imports = []
+for line in result.stderr.splitlines():
+    if not line.startswith("import time:") or "[us]" in line:
+        continue
+    _, cumulative, name = line[len("import time:") :].split("|")
+    imports.append((int(cumulative), name.rstrip()))
+
+total = sum(cumulative for cumulative, name in imports if name[1] != " ")
+print(f"Total import time: {total / 1e6:.2f}s\n")
+print(f"{'Cumulative':>10}  Module")
+for cumulative, name in sorted(imports, reverse=True)[:TOP]:
+    print(f"{cumulative / 1e6:>9.3f}s {name}")
@@ -4,7 +4,10 @@ import traceback
 
 from discord.ext import commands
 
+from tle.util import codeforces_api as cf
 from tle.util import codeforces_common as cf_common
+from tle.util import db
+from tle.util import table
 
 
 def timed_command(coro):
@@ -94,6 +97,82 @@ class CacheControl(commands.Cog):
             )
         await ctx.send(f"Done, fetched {count} problems")
 
+    @cache.command(usage="[handle]")
+    @commands.has_role("Admin")
+    @timed_command
+    async def submissions(self, ctx, handle=None):
+        """Clears saved submissions of the given handle, or of all handles if none
+        is given. They will be fetched afresh when next needed.
+        """
+        count = await cf_common.cache2.submission_cache.clear(handle)
+        await ctx.send(f"Done, cleared {count} submissions")
+
+    @cache.command(usage="[contest_id]")
+    @commands.has_role("Admin")
+    @timed_command
+    async def participants(self, ctx, contest_id: int = None):
+        """Clears saved participants of the given contest, or of all contests if
+        none is given. They will be fetched afresh when next needed.
+        """
+        count = await cf_common.cache2.participation_cache.clear(contest_id)
+        await ctx.send(f"Done, cleared participants of {count} contests")
+
+    @cache.command()
+    @commands.has_role("Admin")
+    async def stats(self, ctx):
+        """Shows contention on the Codeforces API: for each priority, the number
+        of queued and served queries and their wait times in seconds. Also
+        shows usage of the API response cache.
+        """
+        style = table.Style("{:<}  {:>}  {:>}  {:>}  {:>}")
+        t = table.Table(style)
+        t += table.Header(
+            "Priority", "Queued", "Served", "Mean wait", "Max wait"
+        )
+        t += table.Line()
+        for priority, lane in cf.scheduler.stats().items():
+            t += table.Data(
+                priority.name,
+                lane.queued,
+                lane.served,
+                f"{lane.mean_wait:.2f}",
+                f"{lane.max_wait:.2f}",
+            )
+        cache_stats = cf.response_cache.stats()
+        msg = (
+            f"{t}\n\nCall limit exceeded {cf.scheduler.limit_exceeded_count} "
+            f"times, current backoff {cf.scheduler.backoff:.2f}s\n"
+            f"Response cache: {cache_stats.entries} entries, "
+            f"{cache_stats.size / 2**20:.1f} MiB, {cache_stats.hits} hits, "
+            f"{cache_stats.misses} misses"
+        )
+        await ctx.send(f"```\n{msg}\n```")
+
+    @cache.command()
+    @commands.has_role("Admin")
+    async def dbstats(self, ctx, count: int = 20):
+        """Shows the database queries which took the most time in total: the
+        number of calls and the mean, max and total time in milliseconds.
+        """
+        query_stats = sorted(
+            db.query_stats().items(),
+            key=lambda item: item[1].total_time,
+            reverse=True,
+        )
+        style = table.Style("{:<}  {:>}  {:>}  {:>}  {:>}")
+        t = table.Table(style)
+        t += table.Header("Query", "Calls", "Mean", "Max", "Total")
+        t += table.Line()
+        for name, stats in query_stats[:count]:
+            t += table.Data(
+                name,
+                stats.calls,
+                f"{1000 * stats.mean_time:.1f}",
+                f"{1000 * stats.max_time:.1f}",
+                f"{1000 * stats.total_time:.0f}",
+            )
+        await ctx.send(f"```\n{t}\n```")
+
     async def cog_command_error(self, ctx, error):
         if isinstance(error, commands.CommandInvokeError):
             error = error.__cause__
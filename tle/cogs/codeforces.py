@@ -130,14 +130,16 @@ class Codeforces(commands.Cog):
         rating = round(user.effective_rating, -2)
         resp = await cf.user.rating(handle=handle)
         contests = {change.contestId for change in resp}
-        submissions = await cf.user.status(handle=handle)
+        submissions = await cf_common.cache2.submission_cache.get_submissions(handle)
         solved = {sub.problem.name for sub in submissions if sub.verdict == "OK"}
         problems = [
             prob
-            for prob in cf_common.cache2.problem_cache.problems
-            if prob.name not in solved
-            and prob.contestId in contests
-            and abs(rating - prob.rating) <= 300
+            for prob in cf_common.cache2.problem_cache.search(
+                min_rating=rating - 300,
+                max_rating=rating + 300,
+                exclude_names=solved,
+            )
+            if prob.contestId in contests
         ]
 
         if not problems:
@@ -172,7 +174,7 @@ class Codeforces(commands.Cog):
         (handle,) = await cf_common.resolve_handles(
             ctx, self.converter, ("!" + str(ctx.author),)
         )
-        submissions = await cf.user.status(handle=handle)
+        submissions = await cf_common.cache2.submission_cache.get_submissions(handle)
         solved = {sub.problem.name for sub in submissions if sub.verdict == "OK"}
 
         lower = bounds[0] if len(bounds) > 0 else None
@@ -182,16 +184,11 @@ class Codeforces(commands.Cog):
         upper = bounds[1] if len(bounds) > 1 else lower + 200
         problems = [
             prob
-            for prob in cf_common.cache2.problem_cache.problems
-            if lower <= prob.rating and prob.name not in solved
-        ]
-        problems = [
-            prob
-            for prob in problems
+            for prob in cf_common.cache2.problem_cache.search(
+                min_rating=lower, tags=tags, exclude_names=solved
+            )
             if not cf_common.is_contest_writer(prob.contestId, handle)
         ]
-        if tags:
-            problems = [prob for prob in problems if prob.tag_matches(tags)]
         if not problems:
             await ctx.send("Problems not found within the search parameters")
             return
@@ -223,7 +220,9 @@ class Codeforces(commands.Cog):
         args = _mention_to_handle(args, ctx)
         handles = args or ("!" + str(ctx.author),)
         handles = await cf_common.resolve_handles(ctx, self.converter, handles)
-        submissions = [await cf.user.status(handle=handle) for handle in handles]
+        submissions = (
+            await cf_common.cache2.submission_cache.get_submissions_for_handles(handles)
+        )
         submissions = [sub for subs in submissions for sub in subs]
         submissions = filt.filter_subs(submissions)
 
@@ -265,7 +264,9 @@ class Codeforces(commands.Cog):
 
         handles = handles or ("!" + str(ctx.author),)
         handles = await cf_common.resolve_handles(ctx, self.converter, handles)
-        resp = [await cf.user.status(handle=handle) for handle in handles]
+        resp = await cf_common.cache2.submission_cache.get_submissions_for_handles(
+            handles
+        )
         submissions = [sub for user in resp for sub in user]
         solved = {sub.problem.name for sub in submissions}
         info = await cf.user.info(handles=handles)
@@ -274,17 +275,18 @@ class Codeforces(commands.Cog):
         )
         problems = [
             prob
-            for prob in cf_common.cache2.problem_cache.problems
-            if abs(prob.rating - rating) <= 100
-            and prob.name not in solved
-            and not any(
+            for prob in cf_common.cache2.problem_cache.search(
+                min_rating=rating - 100,
+                max_rating=rating + 100,
+                tags=tags,
+                exclude_names=solved,
+                standard_only=True,
+            )
+            if not any(
                 cf_common.is_contest_writer(prob.contestId, handle)
                 for handle in handles
             )
-            and not cf_common.is_nonstandard_problem(prob)
         ]
-        if tags:
-            problems = [prob for prob in problems if prob.tag_matches(tags)]
 
         if len(problems) < 4:
             await ctx.send("Problems not found within the search parameters")
@@ -323,27 +325,22 @@ class Codeforces(commands.Cog):
         )
         user = cf_common.user_db.fetch_cf_user(handle)
         rating = round(user.effective_rating, -2)
-        submissions = await cf.user.status(handle=handle)
+        submissions = await cf_common.cache2.submission_cache.get_submissions(handle)
         solved = {sub.problem.name for sub in submissions}
         noguds = cf_common.user_db.get_noguds(ctx.message.author.id)
         if rating < 800:
             rating = 800
+        problem_rating = max(rating + delta, 800)
         problems = [
             prob
-            for prob in cf_common.cache2.problem_cache.problems
-            if (
-                prob.rating == max(rating + delta,800)
-                and prob.name not in solved
-                and prob.name not in noguds
+            for prob in cf_common.cache2.problem_cache.search(
+                min_rating=problem_rating,
+                max_rating=problem_rating,
+                exclude_names=solved | noguds,
+                standard_only=True,
             )
+            if not cf_common.is_contest_writer(prob.contestId, handle)
         ]
-
-        def check(problem):
-            return not cf_common.is_nonstandard_problem(
-                problem
-            ) and not cf_common.is_contest_writer(problem.contestId, handle)
-
-        problems = list(filter(check, problems))
         if not problems:
             await ctx.send("No problem to assign")
             return
@@ -396,7 +393,10 @@ class Codeforces(commands.Cog):
             await ctx.send(f"You do not have an active challenge")
             return
 
-        submissions = await cf.user.status(handle=handle)
+        with cf.uncached():
+            submissions = await cf_common.cache2.submission_cache.get_submissions(
+                handle
+            )
         solved = {sub.problem.name for sub in submissions if sub.verdict == "OK"}
 
         challenge_id, issue_time, name, contestId, index, delta = active
@@ -458,7 +458,9 @@ class Codeforces(commands.Cog):
         handles = await cf_common.resolve_handles(
             ctx, self.converter, handles, maxcnt=10
         )
-        user_submissions = [await cf.user.status(handle=handle) for handle in handles]
+        user_submissions = (
+            await cf_common.cache2.submission_cache.get_submissions_for_handles(handles)
+        )
         info = await cf.user.info(handles=handles)
         contests = cf_common.cache2.contest_cache.get_contests_in_phase("FINISHED")
         problem_to_contests = cf_common.cache2.problemset_cache.problem_to_contests
@@ -538,7 +540,7 @@ class Codeforces(commands.Cog):
 
         # subs_by_contest_id contains contest_id mapped to [list of problem.name]
         subs_by_contest_id = defaultdict(set)
-        for sub in await cf.user.status(handle=handle):
+        for sub in await cf_common.cache2.submission_cache.get_submissions(handle):
             if sub.verdict == "OK":
                 try:
                     contest = cf_common.cache2.contest_cache.get_contest(
@@ -1,4 +1,3 @@
-import asyncio
 import datetime
 import functools
 import json
@@ -21,6 +20,7 @@ from tle.util import discord_common
 from tle.util import events
 from tle.util import paginator
 from tle.util import ranklist as rl
+from tle.util import scheduler
 from tle.util import table
 from tle.util import tasks
 
@@ -86,11 +86,7 @@ def _get_embed_fields_from_contests(contests):
     return fields
 
 
-async def _send_reminder_at(channel, role, contests, before_secs, send_time):
-    delay = send_time - time.time()
-    if delay <= 0:
-        return
-    await asyncio.sleep(delay)
+async def _send_reminder(channel, role, contests, before_secs):
     values = cf_common.time_format(before_secs)
 
     def make(value, label):
@@ -116,7 +112,10 @@ class Contests(commands.Cog):
         self.active_contests = None
         self.finished_contests = None
         self.start_time_map = defaultdict(list)
-        self.task_map = defaultdict(list)
+        # Reminders by guild, keyed by contest start time and seconds before.
+        self.reminders = scheduler.DeadlineScheduler(
+            "ContestReminders", self._send_scheduled_reminder
+        )
 
         self.member_converter = commands.MemberConverter()
         self.role_converter = commands.RoleConverter()
@@ -127,6 +126,9 @@ class Contests(commands.Cog):
     async def on_ready(self):
         self._update_task.start()
 
+    def cog_unload(self):
+        self.reminders.stop()
+
     @tasks.task_spec(
         name="ContestCogUpdate",
         waiter=tasks.Waiter.for_event(events.ContestListRefresh),
@@ -156,46 +158,58 @@ class Contests(commands.Cog):
         self._reschedule_all_tasks()
 
     def _reschedule_all_tasks(self):
-        for guild in self.bot.guilds:
-            self._reschedule_tasks(guild.id)
+        guild_ids = {guild.id for guild in self.bot.guilds}
+        for guild_id in guild_ids | self.reminders.groups():
+            self._reschedule_tasks(guild_id)
+        self.logger.info(f"{self.reminders.pending()} reminders pending")
 
     def _reschedule_tasks(self, guild_id):
-        for task in self.task_map[guild_id]:
-            task.cancel()
-        self.task_map[guild_id].clear()
-        self.logger.info(f"Tasks for guild {guild_id} cleared")
-        if not self.start_time_map:
-            return
+        reminders = self._get_reminders(guild_id)
+        added, removed = self.reminders.sync(guild_id, reminders)
+        if added or removed:
+            self.logger.info(
+                f"Reminders for guild {guild_id}: {added} added, {removed} removed"
+            )
+
+    def _get_reminders(self, guild_id):
+        if not self.start_time_map or self.bot.get_guild(guild_id) is None:
+            return {}
         try:
             settings = cf_common.user_db.get_reminder_settings(guild_id)
         except db.DatabaseDisabledError:
-            return
+            return {}
         if settings is None:
-            return
+            return {}
         channel_id, role_id, before = settings
         channel_id, role_id, before = (
             int(channel_id),
             int(role_id),
             json.loads(before),
         )
-        guild = self.bot.get_guild(guild_id)
-        channel, role = guild.get_channel(channel_id), guild.get_role(role_id)
+        reminders = {}
         for start_time, contests in self.start_time_map.items():
             for before_mins in before:
                 before_secs = 60 * before_mins
-                task = asyncio.create_task(
-                    _send_reminder_at(
-                        channel,
-                        role,
-                        contests,
-                        before_secs,
-                        start_time - before_secs,
-                    )
+                reminders[start_time, before_secs] = (
+                    start_time - before_secs,
+                    (channel_id, role_id, tuple(contests)),
                 )
-                self.task_map[guild_id].append(task)
-        self.logger.info(
-            f"{len(self.task_map[guild_id])} tasks scheduled for guild {guild_id}"
-        )
+        return reminders
+
+    async def _send_scheduled_reminder(self, guild_id, key, payload):
+        _, before_secs = key
+        channel_id, role_id, contests = payload
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            return
+        channel, role = guild.get_channel(channel_id), guild.get_role(role_id)
+        if channel is None or role is None:
+            self.logger.warning(
+                f"Reminder channel or role of guild {guild_id} is gone, "
+                "reminder not sent."
+            )
+            return
+        await _send_reminder(channel, role, contests, before_secs)
 
     @staticmethod
     def _make_contest_pages(contests, title):
@@ -312,6 +326,9 @@ class Contests(commands.Cog):
         embed.add_field(name="Channel", value=channel.mention)
         embed.add_field(name="Role", value=role.mention)
         embed.add_field(name="Before", value=f"At {before_str} mins before contest")
+        embed.add_field(
+            name="Pending", value=f"{self.reminders.pending(ctx.guild.id)} reminders"
+        )
         await ctx.send(embed=embed)
 
     @staticmethod
@@ -686,27 +703,24 @@ class Contests(commands.Cog):
             contests_usable, key=lambda x: x.startTimeSeconds + x.durationSeconds
         )
 
-        async def get_standings(contest):
-            try:
-                ranklist = cf_common.cache2.ranklist_cache.get_ranklist(contest)
-            except cache_system2.RanklistNotMonitored:
-                ranklist = await cf_common.cache2.ranklist_cache.generate_ranklist(
-                    contest.id, fetch_changes=True
-                )
-            return ranklist
-
         wait_msg = await ctx.send("Please wait...")
 
-        """
-        Figure out how caching works. Ideally, we should store ranklists and rating changes
-        in cache and then fetch directly from cache.
-        """
-        contest_standings = [
-            await get_standings(contest) for contest in contests_usable
-        ]
-
-        TIMES_PER_SECOND = 1
-        PAUSE_DELAY = 1 / TIMES_PER_SECOND + 0.01
+        # Participants of finished contests and old submissions are saved, so
+        # only what is new since the last report is fetched.
+        handles = list(dict.fromkeys(handles))
+        participants_by_contest = (
+            await cf_common.cache2.participation_cache.get_participants(
+                contests_usable, handles
+            )
+        )
+        submissions_by_handle = dict(
+            zip(
+                handles,
+                await cf_common.cache2.submission_cache.get_submissions_for_handles(
+                    handles, complete_before=end_seconds
+                ),
+            )
+        )
 
         class HandleContestData:
             rank_to_role = {role.name: role for role in ctx.guild.roles}
@@ -725,19 +739,15 @@ class Contests(commands.Cog):
                 self.peak_rating = 0
                 self.initial_rating = -1
 
-            def update_with_ranklist(self, ranklist):
-                if self.handle not in ranklist.standing_by_id:
+            def update_with_participants(self, participants):
+                if self.handle not in participants:
                     return
 
                 self.contest_count += 1
 
-                if (
-                    ranklist.changes_by_handle
-                    and self.handle in ranklist.changes_by_handle
-                ):
-                    change = ranklist.changes_by_handle[self.handle]
+                old, new = participants[self.handle]
+                if old is not None:
                     self.rated_count += 1
-                    old, new = change.oldRating, change.newRating
                     self.average_rating += new
                     delta = new - old
                     if delta > 0:
@@ -747,8 +757,7 @@ class Contests(commands.Cog):
                     if self.initial_rating == -1:
                         self.initial_rating = old
 
-            async def count_problems_solved(self):
-                submissions = await cf.user.status(handle=self.handle)
+            def count_problems_solved(self, submissions):
                 self.problems_solved = len(
                     set(
                         [
@@ -794,17 +803,13 @@ class Contests(commands.Cog):
 
         for handle in handles:
             obj = HandleContestData(handle)
-            for ranklist in contest_standings:
-                obj.update_with_ranklist(ranklist)
+            for contest in contests_usable:
+                obj.update_with_participants(participants_by_contest[contest.id])
             if obj.initial_rating == -1:
                 no_contest_handles.append(obj.handle)
+            obj.count_problems_solved(submissions_by_handle[handle])
             handle_contest_data.append(obj)
 
-        time.sleep(PAUSE_DELAY)
-        for obj in handle_contest_data:
-            await obj.count_problems_solved()
-            time.sleep(PAUSE_DELAY)
-
         # this will handle chunk creation etc.
         information = await cf.user.info(handles=no_contest_handles)
         for info in information:
@@ -6,7 +6,6 @@ import itertools
 
 from discord.ext import commands
 from collections import defaultdict, namedtuple
-from matplotlib import pyplot as plt
 
 from tle.util.db.user_db_conn import Duel, DuelType, Winner
 from tle.util import codeforces_api as cf
@@ -99,11 +98,47 @@ def complete_duel(
     return embed
 
 
+def _draw_duel_rating(fig, all_rating_data, labels, time_tick, ylim):
+    ax = fig.subplots()
+    for rating_data in all_rating_data:
+        x, y = zip(*rating_data)
+        ax.plot(
+            x,
+            y,
+            linestyle="-",
+            marker="o",
+            markersize=2,
+            markerfacecolor="white",
+            markeredgewidth=0.5,
+        )
+
+    gc.plot_rating_bg(ax, DUEL_RANKS)
+    ax.set_xlim(0, time_tick - 1)
+    ax.set_ylim(*ylim)
+    ax.legend(labels, loc="upper left", prop=gc.fontprop)
+
+
 class Dueling(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.converter = commands.MemberConverter()
         self.draw_offers = {}
+        self.duel_rating_history_checked = False
+
+    def _ensure_duel_rating_history(self):
+        """Builds the duel rating history from the completed duels if some of
+        them are missing from it, as when the history was first introduced.
+        Completed duels are added to it as they complete, so this is only
+        checked once."""
+        if self.duel_rating_history_checked:
+            return
+        if not cf_common.user_db.is_duel_rating_history_complete():
+            cf_common.user_db.rebuild_duel_rating_history(
+                lambda player, opponent, win: round(
+                    elo_delta(player, opponent, win)
+                )
+            )
+        self.duel_rating_history_checked = True
 
     @commands.group(brief="Duel commands", invoke_without_command=True, aliases=["dual"])
     async def duel(self, ctx):
@@ -143,9 +178,8 @@ class Dueling(commands.Cog):
             cf_common.user_db.get_handle(userid, ctx.guild.id)
             for userid in userids
         ]
-        submissions = [
-            await cf.user.status(handle=handle) for handle in handles
-        ]
+        submission_cache = cf_common.cache2.submission_cache
+        submissions = await submission_cache.get_submissions_for_handles(handles)
 
         if not cf_common.user_db.is_duelist(challenger_id):
             raise DuelCogError(
@@ -188,15 +222,16 @@ class Dueling(commands.Cog):
         def get_problems(rating):
             return [
                 prob
-                for prob in cf_common.cache2.problem_cache.problems
-                if prob.rating == rating
-                and prob.name not in solved
-                and prob.name not in seen
-                and not any(
+                for prob in cf_common.cache2.problem_cache.search(
+                    min_rating=rating,
+                    max_rating=rating,
+                    exclude_names=solved | seen,
+                    standard_only=True,
+                )
+                if not any(
                     cf_common.is_contest_writer(prob.contestId, handle)
                     for handle in handles
                 )
-                and not cf_common.is_nonstandard_problem(prob)
             ]
 
         for problems in map(get_problems, range(rating, 400, -100)):
@@ -321,7 +356,9 @@ class Dueling(commands.Cog):
             handle = cf_common.user_db.get_handle(userid, ctx.guild.id)
             subs = [
                 sub
-                for sub in await cf.user.status(handle=handle)
+                for sub in await cf_common.cache2.submission_cache.get_submissions(
+                    handle
+                )
                 if (sub.verdict == "OK" or sub.verdict == "TESTING")
                 and sub.problem.contestId == contest_id
                 and sub.problem.index == index
@@ -335,8 +372,9 @@ class Dueling(commands.Cog):
                 subs, key=lambda sub: sub.creationTimeSeconds
             ).creationTimeSeconds
 
-        challenger_time = await get_solve_time(challenger_id)
-        challengee_time = await get_solve_time(challengee_id)
+        with cf.uncached():
+            challenger_time = await get_solve_time(challenger_id)
+            challengee_time = await get_solve_time(challengee_id)
 
         if challenger_time == TESTING or challengee_time == TESTING:
             await ctx.send(
@@ -688,19 +726,17 @@ class Dueling(commands.Cog):
     @duel.command(brief="Show duelists")
     async def ranklist(self, ctx):
         """Show the list of duelists with their duel rating."""
+        self._ensure_duel_rating_history()
         users = [
-            (ctx.guild.get_member(user_id), rating)
-            for user_id, rating in cf_common.user_db.get_duelists()
+            (ctx.guild.get_member(user_id), handle, rating)
+            for user_id, handle, rating in cf_common.user_db.get_duel_ranklist(
+                ctx.guild.id
+            )
         ]
         users = [
-            (
-                member,
-                cf_common.user_db.get_handle(member.id, ctx.guild.id),
-                rating,
-            )
-            for member, rating in users
+            (member, handle, rating)
+            for member, handle, rating in users
             if member is not None
-            and cf_common.user_db.get_num_duel_completed(member.id) > 0
         ]
 
         _PER_PAGE = 10
@@ -786,37 +822,19 @@ class Dueling(commands.Cog):
             raise DuelCogError(f"Cannot plot more than 5 duelists at once.")
 
         duelists = [member.id for member in members]
-        duels = cf_common.user_db.get_complete_duels()
-        rating = dict()
+        self._ensure_duel_rating_history()
+        history = cf_common.user_db.get_duel_rating_history(duelists)
         plot_data = defaultdict(list)
-        time_tick = 0
-        for challenger, challengee, winner, finish_time in duels:
-            challenger_r = rating.get(challenger, 1500)
-            challengee_r = rating.get(challengee, 1500)
-            if winner == Winner.CHALLENGER:
-                delta = round(elo_delta(challenger_r, challengee_r, 1))
-            elif winner == Winner.CHALLENGEE:
-                delta = round(elo_delta(challenger_r, challengee_r, 0))
-            else:
-                delta = round(elo_delta(challenger_r, challengee_r, 0.5))
-
-            rating[challenger] = challenger_r + delta
-            rating[challengee] = challengee_r - delta
-            if challenger in duelists or challengee in duelists:
-                if challenger in duelists:
-                    plot_data[challenger].append(
-                        (time_tick, rating[challenger])
-                    )
-                if challengee in duelists:
-                    plot_data[challengee].append(
-                        (time_tick, rating[challengee])
-                    )
-                time_tick += 1
+        # Duels between two of the duelists are plotted at one tick.
+        tick_by_duel = {}
+        for duelid, duelist, rating in history:
+            time_tick = tick_by_duel.setdefault(duelid, len(tick_by_duel))
+            plot_data[duelist].append((time_tick, rating))
+        time_tick = len(tick_by_duel)
 
         if time_tick == 0:
             raise DuelCogError(f"Nothing to plot.")
 
-        plt.clf()
         # plot at least from mid gray to mid purple
         min_rating = 1350
         max_rating = 1550
@@ -825,21 +843,6 @@ class Dueling(commands.Cog):
                 min_rating = min(min_rating, rating)
                 max_rating = max(max_rating, rating)
 
-            x, y = zip(*rating_data)
-            plt.plot(
-                x,
-                y,
-                linestyle="-",
-                marker="o",
-                markersize=2,
-                markerfacecolor="white",
-                markeredgewidth=0.5,
-            )
-
-        gc.plot_rating_bg(DUEL_RANKS)
-        plt.xlim(0, time_tick - 1)
-        plt.ylim(min_rating - 100, max_rating + 100)
-
         labels = [
             gc.StrWrap(
                 "{} ({})".format(
@@ -849,9 +852,13 @@ class Dueling(commands.Cog):
             )
             for duelist, rating_data in plot_data.items()
         ]
-        plt.legend(labels, loc="upper left", prop=gc.fontprop)
-
-        discord_file = gc.get_current_figure_as_file()
+        discord_file = await gc.render_as_file(
+            _draw_duel_rating,
+            list(plot_data.values()),
+            labels,
+            time_tick,
+            (min_rating - 100, max_rating + 100),
+        )
         embed = discord_common.cf_color_embed(title="Duel rating graph")
         discord_common.attach_image(embed, discord_file)
         discord_common.set_author_footer(embed, ctx.author)
@@ -1,4 +1,3 @@
-import bisect
 import collections
 import datetime as dt
 import time
@@ -6,23 +5,26 @@ from typing import List
 
 import discord
 import numpy as np
-import pandas as pd
-import seaborn as sns
 from discord.ext import commands
-from matplotlib import pyplot as plt
-from matplotlib import patches as patches
-from matplotlib import lines as mlines
 
 from tle import constants
 from tle.util import codeforces_api as cf
 from tle.util import codeforces_common as cf_common
 from tle.util import discord_common
 from tle.util import graph_common as gc
+from tle.util import lazy
+from tle.util import table
 
-pd.plotting.register_matplotlib_converters()
+# Only needed by the render workers.
+pd = lazy.import_module("pandas")
+sns = lazy.import_module("seaborn")
+mpl = lazy.import_module("matplotlib")
+patches = lazy.import_module("matplotlib.patches")
+mlines = lazy.import_module("matplotlib.lines")
 
 # A user is considered active if the duration since his last contest is not more than this
 CONTEST_ACTIVE_TIME_CUTOFF = 90 * 24 * 60 * 60  # 90 days
+CFDISTRIB_CUTOFF_BUCKET = 60 * 60  # 1 hour
 
 
 class GraphCogError(commands.CommandError):
@@ -39,7 +41,7 @@ def nice_sub_type(types):
     return [nice_map[t] for t in types]
 
 
-def _plot_rating(resp, mark="o"):
+def _plot_rating(ax, resp, mark="o"):
 
     for rating_changes in resp:
         ratings, times = [], []
@@ -49,7 +51,7 @@ def _plot_rating(resp, mark="o"):
                 dt.datetime.fromtimestamp(rating_change.ratingUpdateTimeSeconds)
             )
 
-        plt.plot(
+        ax.plot(
             times,
             ratings,
             linestyle="-",
@@ -59,8 +61,8 @@ def _plot_rating(resp, mark="o"):
             markeredgewidth=0.5,
         )
 
-    gc.plot_rating_bg(cf.RATED_RANKS)
-    plt.gcf().autofmt_xdate()
+    gc.plot_rating_bg(ax, cf.RATED_RANKS)
+    ax.figure.autofmt_xdate()
 
 
 def _classify_submissions(submissions):
@@ -70,11 +72,11 @@ def _classify_submissions(submissions):
     return solved_by_type
 
 
-def _plot_scatter(regular, practice, virtual, point_size):
+def _plot_scatter(ax, regular, practice, virtual, point_size):
     for contest in [practice, regular, virtual]:
         if contest:
             times, ratings = zip(*contest)
-            plt.scatter(times, ratings, zorder=10, s=point_size)
+            ax.scatter(times, ratings, zorder=10, s=point_size)
 
 
 def _running_mean(x, bin_size):
@@ -117,9 +119,7 @@ def _get_extremes(contest, problemset, submissions):
     return min_unsolved, max_solved
 
 
-def _plot_extreme(
-    handle, rating, packed_contest_subs_problemset, solved, unsolved
-):
+def _classify_extremes(packed_contest_subs_problemset):
     extremes = [
         (
             dt.datetime.fromtimestamp(contest.end_time),
@@ -141,14 +141,21 @@ def _plot_extreme(
             # No rated problems in the contest, which means rating is not yet available for
             # problems in this contest. Skip this data point.
             pass
+    return regular, fullsolves, nosolves
+
 
+def _draw_extreme(
+    fig, handle, rating, regular, fullsolves, nosolves, solved, unsolved
+):
     solvedcolor = "tab:orange"
     unsolvedcolor = "tab:blue"
     linecolor = "#00000022"
     outlinecolor = "#00000022"
 
+    ax = fig.subplots()
+
     def scatter_outline(*args, **kwargs):
-        plt.scatter(*args, **kwargs)
+        ax.scatter(*args, **kwargs)
         kwargs["zorder"] -= 1
         kwargs["color"] = outlinecolor
         if kwargs["marker"] == "*":
@@ -161,9 +168,8 @@ def _plot_extreme(
             del kwargs["alpha"]
         if "label" in kwargs:
             del kwargs["label"]
-        plt.scatter(*args, **kwargs)
+        ax.scatter(*args, **kwargs)
 
-    plt.clf()
     time_scatter, plot_min, plot_max = zip(*regular)
     if unsolved:
         scatter_outline(
@@ -186,7 +192,6 @@ def _plot_extreme(
             label="Hardest solved",
         )
 
-    ax = plt.gca()
     if solved and unsolved:
         for t, mn, mx in regular:
             ax.add_line(mlines.Line2D((t, t), (mn, mx), color=linecolor))
@@ -200,16 +205,16 @@ def _plot_extreme(
             *zip(*nosolves), zorder=15, s=32, marker="X", color=unsolvedcolor
         )
 
-    plt.legend(
+    ax.legend(
         title=f"{handle}: {rating}",
-        title_fontsize=plt.rcParams["legend.fontsize"],
+        title_fontsize=mpl.rcParams["legend.fontsize"],
         loc="upper left",
     ).set_zorder(20)
-    gc.plot_rating_bg(cf.RATED_RANKS)
-    plt.gcf().autofmt_xdate()
+    gc.plot_rating_bg(ax, cf.RATED_RANKS)
+    fig.autofmt_xdate()
 
 
-def _plot_average(practice, bin_size, label: str = ""):
+def _plot_average(ax, practice, bin_size, label: str = ""):
     if len(practice) > bin_size:
         sub_times, ratings = map(list, zip(*practice))
 
@@ -221,7 +226,7 @@ def _plot_average(practice, bin_size, label: str = ""):
         ]
         mean_ratings = _running_mean(ratings, bin_size)
 
-        plt.plot(
+        ax.plot(
             mean_sub_times,
             mean_ratings,
             linestyle="-",
@@ -231,6 +236,329 @@ def _plot_average(practice, bin_size, label: str = ""):
             label=label,
         )
 
+
+# Functions drawing the figures of the plot commands. They are run in the
+# render pool, so they receive all data as arguments.
+
+
+def _draw_rating(fig, resp, labels, ylim):
+    ax = fig.subplots()
+    _plot_rating(ax, resp)
+    ax.legend(labels, loc="upper left")
+    if ylim is not None:
+        ax.set_ylim(*ylim)
+
+
+def _draw_solved(fig, all_ratings, hist_bins, labels, legend_title):
+    ax = fig.subplots()
+    ax.set_xlabel("Problem rating")
+    ax.set_ylabel("Number solved")
+    if legend_title is not None:
+        ax.hist(all_ratings, stacked=True, bins=hist_bins, label=labels)
+        ax.legend(
+            title=legend_title,
+            title_fontsize=mpl.rcParams["legend.fontsize"],
+            loc="upper right",
+        )
+    else:
+        ax.hist(all_ratings, bins=hist_bins)
+        ax.legend(labels, loc="upper right")
+
+
+def _draw_hist(fig, all_times, labels, legend_title):
+    ax = fig.subplots()
+    ax.set_xlabel("Time")
+    ax.set_ylabel("Number solved")
+    if legend_title is not None:
+        ax.hist(all_times, stacked=True, label=labels, bins=34)
+        ax.legend(
+            title=legend_title,
+            title_fontsize=mpl.rcParams["legend.fontsize"],
+        )
+    else:
+        ax.hist(all_times)
+        ax.legend(labels)
+    fig.autofmt_xdate()
+
+
+def _draw_scatter(
+    fig,
+    regular,
+    practice,
+    virtual,
+    point_size,
+    bin_size,
+    rating_resp,
+    rlo,
+    rhi,
+):
+    ax = fig.subplots()
+    _plot_scatter(ax, regular, practice, virtual, point_size)
+    labels = []
+    if practice:
+        labels.append("Practice")
+    if regular:
+        labels.append("Regular")
+    if virtual:
+        labels.append("Virtual")
+    ax.legend(labels, loc="upper left")
+    _plot_average(ax, practice, bin_size)
+    _plot_rating(ax, rating_resp, mark="")
+
+    # zoom
+    ymin, ymax = ax.get_ylim()
+    ax.set_ylim(max(ymin, rlo - 100), min(ymax, rhi + 100))
+
+
+def _draw_rating_hist(fig, x, height, binsize, colors, label, l, r, mode):
+    fig.set_size_inches(15, 5)
+    ax = fig.subplots()
+    ax.bar(
+        x,
+        height,
+        binsize * 0.9,
+        color=colors,
+        linewidth=0,
+        tick_label=label,
+        log=(mode == "log"),
+    )
+    ax.tick_params(axis="x", labelrotation=45)
+    ax.set_xlim(l * binsize - binsize // 2, r * binsize + binsize // 2)
+    ax.set_xlabel("Rating")
+    ax.set_ylabel("Number of users")
+
+
+async def _render_rating_hist(ratings, mode, binsize):
+    ratings = [r for r in ratings if r >= 0]
+    assert ratings, "Cannot histogram plot empty list of ratings"
+
+    assert 100 % binsize == 0  # because bins is semi-hardcoded
+    bins = 39 * 100 // binsize
+
+    colors = []
+    low, high = 0, binsize * bins
+    for rank in cf.RATED_RANKS:
+        for r in range(max(rank.low, low), min(rank.high, high), binsize):
+            colors.append("#" + "%06x" % rank.color_embed)
+    assert len(colors) == bins, f"Expected {bins} colors, got {len(colors)}"
+
+    height = [0] * bins
+    for r in ratings:
+        height[r // binsize] += 1
+
+    csum = 0
+    cent = [0]
+    users = sum(height)
+    for h in height:
+        csum += h
+        cent.append(round(100 * csum / users))
+
+    x = [k * binsize for k in range(bins)]
+    label = [f"{r} ({c})" for r, c in zip(x, cent)]
+
+    l, r = 0, bins - 1
+    while not height[l]:
+        l += 1
+    while not height[r]:
+        r -= 1
+    x = x[l : r + 1]
+    cent = cent[l : r + 1]
+    label = label[l : r + 1]
+    colors = colors[l : r + 1]
+    height = height[l : r + 1]
+
+    return await gc.render_pool.render(
+        _draw_rating_hist, x, height, binsize, colors, label, l, r, mode
+    )
+
+
+def _draw_centile(fig, ratings, perc, users_to_mark, zoom):
+    intervals = [(rank.low, rank.high) for rank in cf.RATED_RANKS]
+    colors = [rank.color_graph for rank in cf.RATED_RANKS]
+
+    ax = fig.subplots()
+    ax.plot(ratings, perc, color="#00000099")
+
+    ax.set_xlabel("Rating")
+    ax.set_ylabel("Percentile")
+
+    for pos in ["right", "top", "bottom", "left"]:
+        ax.spines[pos].set_visible(False)
+    ax.tick_params(axis="both", which="both", length=0)
+
+    # Color intervals by rank
+    for interval, color in zip(intervals, colors):
+        alpha = "99"
+        l, r = interval
+        col = color + alpha
+        rect = patches.Rectangle(
+            (l, -50), r - l, 200, edgecolor="none", facecolor=col
+        )
+        ax.add_patch(rect)
+
+    # Mark users in plot
+    for user, point in users_to_mark.items():
+        x, y = point
+        ax.annotate(
+            user,
+            xy=point,
+            xytext=(0, 0),
+            textcoords="offset points",
+            ha="right",
+            va="bottom",
+        )
+        ax.plot(
+            *point,
+            marker="o",
+            markersize=5,
+            color="red",
+            markeredgecolor="darkred",
+        )
+
+    # Set limits (before drawing tick lines)
+    if users_to_mark and zoom:
+        xmargin = 50
+        ymargin = 5
+        xmin = min(point[0] for point in users_to_mark.values())
+        xmax = max(point[0] for point in users_to_mark.values())
+        ymin = min(point[1] for point in users_to_mark.values())
+        ymax = max(point[1] for point in users_to_mark.values())
+        ax.set_xlim(xmin - xmargin, xmax + xmargin)
+        ax.set_ylim(ymin - ymargin, ymax + ymargin)
+    else:
+        ax.set_xlim(ratings[0], ratings[-1])
+        ax.set_ylim(-1.5, 101.5)
+
+    # Draw tick lines
+    linecolor = "#00000022"
+    inf = 10000
+
+    def horz_line(y):
+        l = mlines.Line2D([-inf, inf], [y, y], color=linecolor)
+        ax.add_line(l)
+
+    def vert_line(x):
+        l = mlines.Line2D([x, x], [-inf, inf], color=linecolor)
+        ax.add_line(l)
+
+    for y in ax.get_yticks():
+        horz_line(y)
+    for x in ax.get_xticks():
+        vert_line(x)
+
+
+def _draw_howgud(fig, deltas, hist_bins, labels):
+    ax = fig.subplots()
+    ax.margins(x=0)
+    ax.hist(deltas, bins=hist_bins, label=labels, rwidth=1)
+    ax.set_xlabel("Problem delta")
+    ax.set_ylabel("Number solved")
+    ax.legend(prop=gc.fontprop)
+
+
+def _rotate_xticklabels(ax, rotation):
+    for label in ax.get_xticklabels():
+        label.set_rotation(rotation)
+        label.set_horizontalalignment("right")
+
+
+def _draw_country_counts(fig, countries, counts):
+    fig.set_size_inches(15, 5)
+    with sns.axes_style(rc={"xtick.bottom": True}):
+        ax = fig.subplots()
+        sns.barplot(x=countries, y=counts, ax=ax)
+
+    # Show counts on top of bars.
+    for p in ax.patches:
+        x = p.get_x() + p.get_width() / 2
+        y = p.get_y() + p.get_height() + 0.5
+        ax.text(
+            x,
+            y,
+            int(p.get_height()),
+            horizontalalignment="center",
+            color="#30304f",
+            fontsize="x-small",
+        )
+
+    _rotate_xticklabels(ax, 40)
+    ax.tick_params(
+        axis="x", length=4, color=ax.spines["bottom"].get_edgecolor()
+    )
+    ax.set_xlabel("Country")
+    ax.set_ylabel("Number of members")
+
+
+def _draw_country_ratings(fig, data, column_order, color_map):
+    df = pd.DataFrame(data, columns=["Country", "Rating"])
+    swarmplot_kwargs = dict(
+        x="Country",
+        y="Rating",
+        hue="Rating",
+        data=df,
+        order=column_order,
+        palette=color_map,
+    )
+    if len(column_order) <= 5:
+        ax = fig.subplots()
+        sns.swarmplot(ax=ax, **swarmplot_kwargs)
+    else:
+        # Add ticks and rotate tick labels to avoid overlap.
+        with sns.axes_style(rc={"xtick.bottom": True}):
+            ax = fig.subplots()
+            sns.swarmplot(ax=ax, **swarmplot_kwargs)
+        _rotate_xticklabels(ax, 30)
+        ax.tick_params(axis="x", color=ax.spines["bottom"].get_edgecolor())
+    if ax.get_legend() is not None:
+        ax.get_legend().remove()
+    ax.set_xlabel("Country")
+    ax.set_ylabel("Rating")
+
+
+def _draw_visualrank(fig, title, ranks, delta, color, users_to_mark, zoom):
+    fig.set_size_inches(12, 8)
+    ax = fig.subplots()
+    ax.set_title(title)
+    ax.set_xlabel("Rank")
+    ax.set_ylabel("Rating Changes")
+
+    ymargin = 50
+    xmargin = 50
+    if users_to_mark and zoom:
+        xmin = min(point[0] for point in users_to_mark.values())
+        xmax = max(point[0] for point in users_to_mark.values())
+        ymin = min(point[1] for point in users_to_mark.values())
+        ymax = max(point[1] for point in users_to_mark.values())
+        mark_size = 2e4 / (xmax - xmin + 2 * xmargin)
+
+        ax.set_xlim(xmin - xmargin, xmax + xmargin)
+        ax.set_ylim(ymin - ymargin, ymax + ymargin)
+    else:
+        ylim = 0
+        if users_to_mark:
+            ylim = max(abs(point[1]) for point in users_to_mark.values())
+        ylim = max(ylim, 200)
+        xmax = max(ranks)
+        mark_size = 2e4 / (xmax + 2 * xmargin)
+
+        ax.set_xlim(-xmargin, xmax + xmargin)
+        ax.set_ylim(-ylim - ymargin, ylim + ymargin)
+
+    ax.scatter(ranks, delta, s=mark_size, c=color)
+
+    for handle, point in users_to_mark.items():
+        ax.annotate(
+            handle,
+            xy=point,
+            xytext=(0, 0),
+            textcoords="offset points",
+            ha="left",
+            va="bottom",
+            fontsize="large",
+        )
+        ax.plot(*point, marker="o", markersize=5, color="black")
+
+
 def _mention_to_handle(args, ctx):
     new_args = []
 
@@ -275,7 +603,9 @@ class Graphs(commands.Cog):
         args = _mention_to_handle(args,ctx)
         handles = args or ("!" + str(ctx.author),)
         handles = await cf_common.resolve_handles(ctx, self.converter, handles)
-        resp = [await cf.user.rating(handle=handle) for handle in handles]
+        resp = cf.unwrap_results(
+            await cf.user.rating_for_handles(handles=handles)
+        )
         resp = [
             filt.filter_rating_changes(rating_changes)
             for rating_changes in resp
@@ -289,8 +619,6 @@ class Graphs(commands.Cog):
                 message = f"None of the given users {handles_str} are rated"
             raise GraphCogError(message)
 
-        plt.clf()
-        _plot_rating(resp)
         current_ratings = [
             rating_changes[-1].newRating if rating_changes else "Unrated"
             for rating_changes in resp
@@ -299,8 +627,8 @@ class Graphs(commands.Cog):
             gc.StrWrap(f"{handle} ({rating})")
             for handle, rating in zip(handles, current_ratings)
         ]
-        plt.legend(labels, loc="upper left")
 
+        ylim = None
         if not zoom:
             min_rating = 1100
             max_rating = 1800
@@ -308,9 +636,11 @@ class Graphs(commands.Cog):
                 for rating in rating_changes:
                     min_rating = min(min_rating, rating.newRating)
                     max_rating = max(max_rating, rating.newRating)
-            plt.ylim(min_rating - 100, max_rating + 200)
+            ylim = (min_rating - 100, max_rating + 200)
 
-        discord_file = gc.get_current_figure_as_file()
+        discord_file = await gc.render_as_file(
+            _draw_rating, resp, labels, ylim
+        )
         embed = discord_common.cf_color_embed(
             title="Rating graph on Codeforces"
         )
@@ -342,7 +672,9 @@ class Graphs(commands.Cog):
 
         contest_ids = [change.contestId for change in ratingchanges]
         subs_by_contest_id = {contest_id: [] for contest_id in contest_ids}
-        for sub in await cf.user.status(handle=handle):
+        for sub in await cf_common.cache2.submission_cache.get_submissions(
+            handle
+        ):
             if sub.contestId in subs_by_contest_id:
                 subs_by_contest_id[sub.contestId].append(sub)
 
@@ -358,11 +690,19 @@ class Graphs(commands.Cog):
         rating = max(
             ratingchanges, key=lambda change: change.ratingUpdateTimeSeconds
         ).newRating
-        _plot_extreme(
-            handle, rating, packed_contest_subs_problemset, solved, unsolved
+        regular, fullsolves, nosolves = _classify_extremes(
+            packed_contest_subs_problemset
+        )
+        discord_file = await gc.render_as_file(
+            _draw_extreme,
+            handle,
+            rating,
+            regular,
+            fullsolves,
+            nosolves,
+            solved,
+            unsolved,
         )
-
-        discord_file = gc.get_current_figure_as_file()
         embed = discord_common.cf_color_embed(title="Codeforces extremes graph")
         discord_common.attach_image(embed, discord_file)
         discord_common.set_author_footer(embed, ctx.author)
@@ -380,7 +720,9 @@ class Graphs(commands.Cog):
         args = _mention_to_handle(args,ctx)
         handles = args or ("!" + str(ctx.author),)
         handles = await cf_common.resolve_handles(ctx, self.converter, handles)
-        resp = [await cf.user.status(handle=handle) for handle in handles]
+        resp = await cf_common.cache2.submission_cache.get_submissions_for_handles(
+            handles
+        )
         all_solved_subs = [
             filt.filter_subs(submissions) for submissions in resp
         ]
@@ -390,9 +732,6 @@ class Graphs(commands.Cog):
                 f"There are no problems within the specified parameters."
             )
 
-        plt.clf()
-        plt.xlabel("Problem rating")
-        plt.ylabel("Number solved")
         if len(handles) == 1:
             # Display solved problem separately by type for a single user.
             handle, solved_by_type = handles[0], _classify_submissions(
@@ -414,13 +753,8 @@ class Graphs(commands.Cog):
             hist_bins = list(
                 range(filt.rlo - step // 2, filt.rhi + step // 2 + 1, step)
             )
-            plt.hist(all_ratings, stacked=True, bins=hist_bins, label=labels)
             total = sum(map(len, all_ratings))
-            plt.legend(
-                title=f"{handle}: {total}",
-                title_fontsize=plt.rcParams["legend.fontsize"],
-                loc="upper right",
-            )
+            legend_title = f"{handle}: {total}"
 
         else:
             all_ratings = [
@@ -436,10 +770,11 @@ class Graphs(commands.Cog):
             hist_bins = list(
                 range(filt.rlo - step // 2, filt.rhi + step // 2 + 1, step)
             )
-            plt.hist(all_ratings, bins=hist_bins)
-            plt.legend(labels, loc="upper right")
+            legend_title = None
 
-        discord_file = gc.get_current_figure_as_file()
+        discord_file = await gc.render_as_file(
+            _draw_solved, all_ratings, hist_bins, labels, legend_title
+        )
         embed = discord_common.cf_color_embed(
             title="Histogram of problems solved on Codeforces"
         )
@@ -458,7 +793,9 @@ class Graphs(commands.Cog):
         args = _mention_to_handle(args,ctx)
         handles = args or ("!" + str(ctx.author),)
         handles = await cf_common.resolve_handles(ctx, self.converter, handles)
-        resp = [await cf.user.status(handle=handle) for handle in handles]
+        resp = await cf_common.cache2.submission_cache.get_submissions_for_handles(
+            handles
+        )
         all_solved_subs = [
             filt.filter_subs(submissions) for submissions in resp
         ]
@@ -468,9 +805,6 @@ class Graphs(commands.Cog):
                 f"There are no problems within the specified parameters."
             )
 
-        plt.clf()
-        plt.xlabel("Time")
-        plt.ylabel("Number solved")
         if len(handles) == 1:
             handle, solved_by_type = handles[0], _classify_submissions(
                 all_solved_subs[0]
@@ -488,13 +822,8 @@ class Graphs(commands.Cog):
                 name.format(len(times))
                 for name, times in zip(nice_names, all_times)
             ]
-            plt.hist(all_times, stacked=True, label=labels, bins=34)
-
             total = sum(map(len, all_times))
-            plt.legend(
-                title=f"{handle}: {total}",
-                title_fontsize=plt.rcParams["legend.fontsize"],
-            )
+            legend_title = f"{handle}: {total}"
         else:
             all_times = [
                 [
@@ -512,11 +841,11 @@ class Graphs(commands.Cog):
                 for handle, times in zip(handles, all_times)
             ]
 
-            plt.hist(all_times)
-            plt.legend(labels)
+            legend_title = None
 
-        plt.gcf().autofmt_xdate()
-        discord_file = gc.get_current_figure_as_file()
+        discord_file = await gc.render_as_file(
+            _draw_hist, all_times, labels, legend_title
+        )
         embed = discord_common.cf_color_embed(
             title="Histogram of number of solved problems over time"
         )
@@ -556,7 +885,9 @@ class Graphs(commands.Cog):
             filt.filter_rating_changes(rating_changes)
             for rating_changes in rating_resp
         ]
-        submissions = filt.filter_subs(await cf.user.status(handle=handle))
+        submissions = filt.filter_subs(
+            await cf_common.cache2.submission_cache.get_submissions(handle)
+        )
 
         def extract_time_and_rating(submissions):
             return [
@@ -579,24 +910,17 @@ class Graphs(commands.Cog):
         practice = extract_time_and_rating(solved_by_type["PRACTICE"])
         virtual = extract_time_and_rating(solved_by_type["VIRTUAL"])
 
-        plt.clf()
-        _plot_scatter(regular, practice, virtual, point_size)
-        labels = []
-        if practice:
-            labels.append("Practice")
-        if regular:
-            labels.append("Regular")
-        if virtual:
-            labels.append("Virtual")
-        plt.legend(labels, loc="upper left")
-        _plot_average(practice, bin_size)
-        _plot_rating(rating_resp, mark="")
-
-        # zoom
-        ymin, ymax = plt.gca().get_ylim()
-        plt.ylim(max(ymin, filt.rlo - 100), min(ymax, filt.rhi + 100))
-
-        discord_file = gc.get_current_figure_as_file()
+        discord_file = await gc.render_as_file(
+            _draw_scatter,
+            regular,
+            practice,
+            virtual,
+            point_size,
+            bin_size,
+            rating_resp,
+            filt.rlo,
+            filt.rhi,
+        )
         embed = discord_common.cf_color_embed(
             title=f"Rating vs solved problem rating for {handle}"
         )
@@ -604,68 +928,18 @@ class Graphs(commands.Cog):
         discord_common.set_author_footer(embed, ctx.author)
         await ctx.send(embed=embed, file=discord_file)
 
-    async def _rating_hist(self, ctx, ratings, mode, binsize, title):
+    async def _rating_hist(self, ctx, key, get_ratings, mode, binsize, title):
+        """Sends a histogram of the ratings returned by `get_ratings()`. The
+        image is cached under `key`, and the ratings are only fetched if it is
+        not cached.
+        """
         if mode not in ("log", "normal"):
             raise GraphCogError("Mode should be either `log` or `normal`")
 
-        ratings = [r for r in ratings if r >= 0]
-        assert ratings, "Cannot histogram plot empty list of ratings"
-
-        assert 100 % binsize == 0  # because bins is semi-hardcoded
-        bins = 39 * 100 // binsize
-
-        colors = []
-        low, high = 0, binsize * bins
-        for rank in cf.RATED_RANKS:
-            for r in range(max(rank.low, low), min(rank.high, high), binsize):
-                colors.append("#" + "%06x" % rank.color_embed)
-        assert len(colors) == bins, f"Expected {bins} colors, got {len(colors)}"
-
-        height = [0] * bins
-        for r in ratings:
-            height[r // binsize] += 1
-
-        csum = 0
-        cent = [0]
-        users = sum(height)
-        for h in height:
-            csum += h
-            cent.append(round(100 * csum / users))
-
-        x = [k * binsize for k in range(bins)]
-        label = [f"{r} ({c})" for r, c in zip(x, cent)]
-
-        l, r = 0, bins - 1
-        while not height[l]:
-            l += 1
-        while not height[r]:
-            r -= 1
-        x = x[l : r + 1]
-        cent = cent[l : r + 1]
-        label = label[l : r + 1]
-        colors = colors[l : r + 1]
-        height = height[l : r + 1]
-
-        plt.clf()
-        fig = plt.figure(figsize=(15, 5))
-
-        plt.xticks(rotation=45)
-        plt.xlim(l * binsize - binsize // 2, r * binsize + binsize // 2)
-        plt.bar(
-            x,
-            height,
-            binsize * 0.9,
-            color=colors,
-            linewidth=0,
-            tick_label=label,
-            log=(mode == "log"),
-        )
-        plt.xlabel("Rating")
-        plt.ylabel("Number of users")
-
-        discord_file = gc.get_current_figure_as_file()
-        plt.close(fig)
+        async def render():
+            return await _render_rating_hist(get_ratings(), mode, binsize)
 
+        discord_file = await gc.cached_image_as_file(key, render)
         embed = discord_common.cf_color_embed(title=title)
         discord_common.attach_image(embed, discord_file)
         discord_common.set_author_footer(embed, ctx.author)
@@ -689,7 +963,8 @@ class Graphs(commands.Cog):
         ]
         await self._rating_hist(
             ctx,
-            ratings,
+            ("distrib", tuple(sorted(ratings))),
+            lambda: ratings,
             "normal",
             binsize=100,
             title="Rating distribution of server members",
@@ -714,22 +989,32 @@ class Graphs(commands.Cog):
             if activity == "active"
             else 0
         )
-        handles = cf_common.cache2.rating_changes_cache.get_users_with_more_than_n_contests(
-            time_cutoff, contest_cutoff
-        )
-        if not handles:
-            raise GraphCogError(
-                "No Codeforces users meet the specified criteria"
-            )
 
-        ratings = [
-            cf_common.cache2.rating_changes_cache.get_current_rating(handle)
-            for handle in handles
-        ]
+        def get_ratings():
+            cache = cf_common.cache2.rating_changes_cache
+            ratings = cache.get_ratings_of_users_with_more_than_n_contests(
+                time_cutoff, contest_cutoff
+            )
+            if not ratings.size:
+                raise GraphCogError(
+                    "No Codeforces users meet the specified criteria"
+                )
+            return ratings
+
+        # The image only changes with rating changes, and the cached image is
+        # dropped on those. Activity is bucketed so the key lives for a while.
+        key = (
+            "cfdistrib",
+            mode,
+            time_cutoff // CFDISTRIB_CUTOFF_BUCKET,
+            contest_cutoff,
+        )
         title = (
             f"Rating distribution of {activity} Codeforces users ({mode} scale)"
         )
-        await self._rating_hist(ctx, ratings, mode, binsize=100, title=title)
+        await self._rating_hist(
+            ctx, key, get_ratings, mode, binsize=100, title=title
+        )
 
     @plot.command(
         brief="Show percentile distribution on codeforces",
@@ -738,105 +1023,32 @@ class Graphs(commands.Cog):
     async def centile(self, ctx, *args: str):
         """Show percentile distribution of codeforces and mark given handles in the plot. If +zoom and handles are given, it zooms to the neighborhood of the handles."""
         (zoom,), args = cf_common.filter_flags(args, ["+zoom"])
-        # Prepare data
-        intervals = [(rank.low, rank.high) for rank in cf.RATED_RANKS]
-        colors = [rank.color_graph for rank in cf.RATED_RANKS]
-
-        ratings = cf_common.cache2.rating_changes_cache.get_all_ratings()
-        ratings = np.array(sorted(ratings))
-        n = len(ratings)
-        perc = 100 * np.arange(n) / n
 
+        cache = cf_common.cache2.rating_changes_cache
+        users_to_mark = {}
         if args:
             handles = await cf_common.resolve_handles(
                 ctx, self.converter, args, mincnt=0, maxcnt=50
             )
             infos = await cf.user.info(handles=list(set(handles)))
 
-            users_to_mark = {}
             for info in infos:
                 if info.rating is None:
                     raise GraphCogError(f"User `{info.handle}` is not rated")
-                ix = bisect.bisect_left(ratings, info.rating)
-                cent = 100 * ix / len(ratings)
+                cent = cache.get_rating_percentile(info.rating)
                 users_to_mark[info.handle] = info.rating, cent
-        else:
-            users_to_mark = {}
-
-        # Plot
-        plt.clf()
-        fig, ax = plt.subplots(1)
-        ax.plot(ratings, perc, color="#00000099")
-
-        plt.xlabel("Rating")
-        plt.ylabel("Percentile")
-
-        for pos in ["right", "top", "bottom", "left"]:
-            ax.spines[pos].set_visible(False)
-        ax.tick_params(axis="both", which="both", length=0)
-
-        # Color intervals by rank
-        for interval, color in zip(intervals, colors):
-            alpha = "99"
-            l, r = interval
-            col = color + alpha
-            rect = patches.Rectangle(
-                (l, -50), r - l, 200, edgecolor="none", facecolor=col
-            )
-            ax.add_patch(rect)
-
-        # Mark users in plot
-        for user, point in users_to_mark.items():
-            x, y = point
-            plt.annotate(
-                user,
-                xy=point,
-                xytext=(0, 0),
-                textcoords="offset points",
-                ha="right",
-                va="bottom",
-            )
-            plt.plot(
-                *point,
-                marker="o",
-                markersize=5,
-                color="red",
-                markeredgecolor="darkred",
-            )
-
-        # Set limits (before drawing tick lines)
-        if users_to_mark and zoom:
-            xmargin = 50
-            ymargin = 5
-            xmin = min(point[0] for point in users_to_mark.values())
-            xmax = max(point[0] for point in users_to_mark.values())
-            ymin = min(point[1] for point in users_to_mark.values())
-            ymax = max(point[1] for point in users_to_mark.values())
-            plt.xlim(xmin - xmargin, xmax + xmargin)
-            plt.ylim(ymin - ymargin, ymax + ymargin)
-        else:
-            plt.xlim(ratings[0], ratings[-1])
-            plt.ylim(-1.5, 101.5)
-
-        # Draw tick lines
-        linecolor = "#00000022"
-        inf = 10000
-
-        def horz_line(y):
-            l = mlines.Line2D([-inf, inf], [y, y], color=linecolor)
-            ax.add_line(l)
 
-        def vert_line(x):
-            l = mlines.Line2D([x, x], [-inf, inf], color=linecolor)
-            ax.add_line(l)
+        async def render():
+            ratings = cache.get_all_ratings()
+            n = len(ratings)
+            perc = 100 * np.arange(n) / n
+            return await gc.render_pool.render(
+                _draw_centile, ratings, perc, users_to_mark, zoom
+            )
 
-        for y in ax.get_yticks():
-            horz_line(y)
-        for x in ax.get_xticks():
-            vert_line(x)
+        key = ("centile", tuple(sorted(users_to_mark.items())), zoom)
+        discord_file = await gc.cached_image_as_file(key, render)
 
-        # Discord stuff
-        discord_file = gc.get_current_figure_as_file()
         embed = discord_common.cf_color_embed(
             title=f"Rating/percentile relationship"
         )
@@ -861,14 +1073,9 @@ class Graphs(commands.Cog):
             for member, delta in zip(members, deltas)
         ]
 
-        plt.clf()
-        plt.margins(x=0)
-        plt.hist(deltas, bins=hist_bins, label=labels, rwidth=1)
-        plt.xlabel("Problem delta")
-        plt.ylabel("Number solved")
-        plt.legend(prop=gc.fontprop)
-
-        discord_file = gc.get_current_figure_as_file()
+        discord_file = await gc.render_as_file(
+            _draw_howgud, deltas, hist_bins, labels
+        )
         embed = discord_common.cf_color_embed(title="Histogram of gudgitting")
         discord_common.attach_image(embed, discord_file)
         discord_common.set_author_footer(embed, ctx.author)
@@ -895,33 +1102,13 @@ class Graphs(commands.Cog):
         if not countries:
             # list because seaborn complains for tuple.
             countries, counts = map(list, zip(*counter.most_common()))
-            plt.clf()
-            fig = plt.figure(figsize=(15, 5))
-            with sns.axes_style(rc={"xtick.bottom": True}):
-                sns.barplot(x=countries, y=counts)
-
-            # Show counts on top of bars.
-            ax = plt.gca()
-            for p in ax.patches:
-                x = p.get_x() + p.get_width() / 2
-                y = p.get_y() + p.get_height() + 0.5
-                ax.text(
-                    x,
-                    y,
-                    int(p.get_height()),
-                    horizontalalignment="center",
-                    color="#30304f",
-                    fontsize="x-small",
-                )
-
-            plt.xticks(rotation=40, horizontalalignment="right")
-            ax.tick_params(
-                axis="x", length=4, color=ax.spines["bottom"].get_edgecolor()
+            key = ("country", tuple(countries), tuple(counts))
+            discord_file = await gc.cached_image_as_file(
+                key,
+                lambda: gc.render_pool.render(
+                    _draw_country_counts, countries, counts
+                ),
             )
-            plt.xlabel("Country")
-            plt.ylabel("Number of members")
-            discord_file = gc.get_current_figure_as_file()
-            plt.close(fig)
             embed = discord_common.cf_color_embed(
                 title="Distribution of server members by country"
             )
@@ -941,42 +1128,22 @@ class Graphs(commands.Cog):
                 rating: f"#{cf.rating2rank(rating).color_embed:06x}"
                 for _, rating in data
             }
-            df = pd.DataFrame(data, columns=["Country", "Rating"])
             column_order = sorted(
                 (country for country in countries if counter[country]),
                 key=counter.get,
                 reverse=True,
             )
-            plt.clf()
-            if len(column_order) <= 5:
-                sns.swarmplot(
-                    x="Country",
-                    y="Rating",
-                    hue="Rating",
-                    data=df,
-                    order=column_order,
-                    palette=color_map,
-                )
-            else:
-                # Add ticks and rotate tick labels to avoid overlap.
-                with sns.axes_style(rc={"xtick.bottom": True}):
-                    sns.swarmplot(
-                        x="Country",
-                        y="Rating",
-                        hue="Rating",
-                        data=df,
-                        order=column_order,
-                        palette=color_map,
-                    )
-                plt.xticks(rotation=30, horizontalalignment="right")
-                ax = plt.gca()
-                ax.tick_params(
-                    axis="x", color=ax.spines["bottom"].get_edgecolor()
-                )
-            plt.legend().remove()
-            plt.xlabel("Country")
-            plt.ylabel("Rating")
-            discord_file = gc.get_current_figure_as_file()
+            key = (
+                "country",
+                tuple(map(tuple, data)),
+                tuple(column_order),
+            )
+            discord_file = await gc.cached_image_as_file(
+                key,
+                lambda: gc.render_pool.render(
+                    _draw_country_ratings, data, column_order, color_map
+                ),
+            )
             embed = discord_common.cf_color_embed(
                 title="Rating distribution of server members by " "country"
             )
@@ -1037,56 +1204,39 @@ class Graphs(commands.Cog):
 
         title = users[0].contestName
 
-        plt.clf()
-        fig = plt.figure(figsize=(12, 8))
-        plt.title(title)
-        plt.xlabel("Rank")
-        plt.ylabel("Rating Changes")
-
-        ymargin = 50
-        xmargin = 50
-        if users_to_mark and zoom:
-            xmin = min(point[0] for point in users_to_mark.values())
-            xmax = max(point[0] for point in users_to_mark.values())
-            ymin = min(point[1] for point in users_to_mark.values())
-            ymax = max(point[1] for point in users_to_mark.values())
-            mark_size = 2e4 / (xmax - xmin + 2 * xmargin)
-
-            plt.xlim(xmin - xmargin, xmax + xmargin)
-            plt.ylim(ymin - ymargin, ymax + ymargin)
-        else:
-            ylim = 0
-            if users_to_mark:
-                ylim = max(abs(point[1]) for point in users_to_mark.values())
-            ylim = max(ylim, 200)
-            xmax = max(user.rank for user in users)
-            mark_size = 2e4 / (xmax + 2 * xmargin)
-
-            plt.xlim(-xmargin, xmax + xmargin)
-            plt.ylim(-ylim - ymargin, ylim + ymargin)
-
-        plt.scatter(ranks, delta, s=mark_size, c=color)
-
-        for handle, point in users_to_mark.items():
-            plt.annotate(
-                handle,
-                xy=point,
-                xytext=(0, 0),
-                textcoords="offset points",
-                ha="left",
-                va="bottom",
-                fontsize="large",
-            )
-            plt.plot(*point, marker="o", markersize=5, color="black")
-
-        discord_file = gc.get_current_figure_as_file()
-        plt.close(fig)
+        discord_file = await gc.render_as_file(
+            _draw_visualrank, title, ranks, delta, color, users_to_mark, zoom
+        )
 
         embed = discord_common.cf_color_embed(title=title)
         discord_common.attach_image(embed, discord_file)
         discord_common.set_author_footer(embed, ctx.author)
         await ctx.send(embed=embed, file=discord_file)
 
+    @plot.command(brief="Show plot rendering statistics", hidden=True)
+    @commands.has_role("Admin")
+    async def renderstats(self, ctx):
+        """Shows the number of plots waiting to be rendered, a histogram of
+        render times in seconds for every kind of plot and usage of the
+        rendered image cache."""
+        pool = gc.render_pool
+        buckets = [f"<={bound}" for bound in gc.RENDER_TIME_BUCKETS[:-1]]
+        buckets.append(f">{gc.RENDER_TIME_BUCKETS[-2]}")
+        style = table.Style("{:<}" + "  {:>}" * len(buckets))
+        t = table.Table(style)
+        t += table.Header("Plot", *buckets)
+        t += table.Line()
+        for name, histogram in sorted(pool.render_time_histograms.items()):
+            t += table.Data(name.lstrip("_"), *histogram)
+        cache_stats = gc.image_cache.stats()
+        msg = (
+            f"{t}\n\n{pool.queued} plots waiting for {pool.workers} workers\n"
+            f"Image cache: {cache_stats.entries} entries, "
+            f"{cache_stats.size / 2**20:.1f} MiB, {cache_stats.hits} hits, "
+            f"{cache_stats.misses} misses"
+        )
+        await ctx.send(f"```\n{msg}\n```")
+
     @discord_common.send_error_if(
         GraphCogError, cf_common.ResolveHandleError, cf_common.FilterError
     )
@@ -1,4 +1,3 @@
-from PIL import Image, ImageFont, ImageDraw
 from tle import constants
 from tle.util import db
 from tle.util import tasks
@@ -9,24 +8,37 @@ from tle.util import discord_common
 from tle.util import codeforces_common as cf_common
 from tle.util import codeforces_api as cf
 from tle.util import cache_system2
+from tle.util import graph_common as gc
+from tle.util import lazy
 from discord.ext import commands
 import random
 import discord
-from gi.repository import Pango, PangoCairo
 import io
 import asyncio
 import contextlib
 import logging
 import math
 import html
-import cairo
 import os
 import time
-import gi
 import requests
 
-gi.require_version("Pango", "1.0")
-gi.require_version("PangoCairo", "1.0")
+
+def _require_gi_versions():
+    gi.require_version("Pango", "1.0")
+    gi.require_version("PangoCairo", "1.0")
+
+
+# The imaging libraries are imported on first use.
+Image = lazy.import_module("PIL.Image")
+ImageDraw = lazy.import_module("PIL.ImageDraw")
+ImageFont = lazy.import_module("PIL.ImageFont")
+cairo = lazy.import_module("cairo")
+gi = lazy.import_module("gi")
+Pango = lazy.import_module("gi.repository.Pango", before_import=_require_gi_versions)
+PangoCairo = lazy.import_module(
+    "gi.repository.PangoCairo", before_import=_require_gi_versions
+)
 
 _HANDLES_PER_PAGE = 15
 _NAME_MAX_LEN = 20
@@ -81,7 +93,7 @@ FONTS = [
 
 
 def get_gudgitters_image(rankings):
-    """return PIL image for rankings"""
+    """return PNG image for rankings"""
     SMOKE_WHITE = (250, 250, 250)
     BLACK = (0, 0, 0)
 
@@ -160,9 +172,7 @@ def get_gudgitters_image(rankings):
 
     image_data = io.BytesIO()
     surface.write_to_png(image_data)
-    image_data.seek(0)
-    discord_file = discord.File(image_data, filename="gudgitters.png")
-    return discord_file
+    return image_data.getvalue()
 
 
 def get_prettyhandles_image(rows, font):
@@ -259,9 +269,16 @@ class Handles(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.logger = logging.getLogger(self.__class__.__name__)
-        self.font = ImageFont.truetype(
-            constants.NOTO_SANS_CJK_BOLD_FONT_PATH, size=26
-        )  # font for ;handle pretty
+        self._font = None
+
+    @property
+    def font(self):
+        # font for ;handle pretty, loaded on first use
+        if self._font is None:
+            self._font = ImageFont.truetype(
+                constants.NOTO_SANS_CJK_BOLD_FONT_PATH, size=26
+            )
+        return self._font
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -448,11 +465,7 @@ class Handles(commands.Cog):
                 " your handle will be identified. If you're an alumni, contact `@bot-admin`."
             )
 
-        problems = [
-            prob
-            for prob in cf_common.cache2.problem_cache.problems
-            if prob.rating <= 1200
-        ]
+        problems = cf_common.cache2.problem_cache.search(max_rating=1200)
         problem = random.choice(problems)
         await ctx.send(
             f"`{invoker}`, submit a compile error to <{problem.url}> within 60 seconds"
@@ -531,7 +544,13 @@ class Handles(commands.Cog):
             raise HandleCogError(
                 "No one has completed a gitgud challenge, send ;gitgud to request and ;gotgud to mark it as complete"
             )
-        discord_file = get_gudgitters_image(rankings)
+
+        async def render():
+            return get_gudgitters_image(rankings)
+
+        discord_file = await gc.cached_image_as_file(
+            ("gudgitters", tuple(rankings)), render, filename="gudgitters.png"
+        )
         await ctx.send(file=discord_file)
 
     @handle.command(brief="Show all handles")
@@ -615,11 +634,17 @@ class Handles(commands.Cog):
             num_before = (_PRETTY_HANDLES_PER_PAGE - 1) // 2
             start_idx = max(0, author_idx - num_before)
         rows_to_display = rows[start_idx : start_idx + _PRETTY_HANDLES_PER_PAGE]
-        img = get_prettyhandles_image(rows_to_display, self.font)
-        buffer = io.BytesIO()
-        img.save(buffer, "png")
-        buffer.seek(0)
-        await ctx.send(msg, file=discord.File(buffer, "handles.png"))
+
+        async def render():
+            img = get_prettyhandles_image(rows_to_display, self.font)
+            buffer = io.BytesIO()
+            img.save(buffer, "png")
+            return buffer.getvalue()
+
+        discord_file = await gc.cached_image_as_file(
+            ("pretty", tuple(rows_to_display)), render, filename="handles.png"
+        )
+        await ctx.send(msg, file=discord_file)
 
     async def _update_ranks(self, guild):
         """For each member in the guild, fetches their current ratings and updates their role if
@@ -636,8 +661,7 @@ class Handles(commands.Cog):
             raise HandleCogError("Handles not set for any user")
         members, handles = zip(*member_handles)
         users = await cf.user.info(handles=handles)
-        for user in users:
-            cf_common.user_db.cache_cf_user(user)
+        cf_common.user_db.cache_cf_users(users)
 
         required_roles = {
             user.rank.title for user in users if user.rank != cf.UNRATED_RANK
@@ -270,9 +270,8 @@ class Tournament(commands.Cog):
             cf_common.user_db.get_handle(userid, ctx.guild.id)
             for userid in userids
         ]
-        submissions = [
-            await cf.user.status(handle=handle) for handle in handles
-        ]
+        submission_cache = cf_common.cache2.submission_cache
+        submissions = await submission_cache.get_submissions_for_handles(handles)
 
         users = [cf_common.user_db.fetch_cf_user(handle) for handle in handles]
 
@@ -300,16 +299,16 @@ class Tournament(commands.Cog):
         def get_problems(rating):
             return [
                 prob
-                for prob in cf_common.cache2.problem_cache.problems
-                if prob.rating == rating
-                and prob.name not in solved
-                and prob.name not in seen
-                and prob.name not in seen2
-                and not any(
+                for prob in cf_common.cache2.problem_cache.search(
+                    min_rating=rating,
+                    max_rating=rating,
+                    exclude_names=solved | seen | seen2,
+                    standard_only=True,
+                )
+                if not any(
                     cf_common.is_contest_writer(prob.contestId, handle)
                     for handle in handles
                 )
-                and not cf_common.is_nonstandard_problem(prob)
             ]
 
         for problems in map(get_problems, range(rating, 400, -100)):
@@ -457,7 +456,9 @@ class Tournament(commands.Cog):
             handle = cf_common.user_db.get_handle(userid, ctx.guild.id)
             subs = [
                 sub
-                for sub in await cf.user.status(handle=handle)
+                for sub in await cf_common.cache2.submission_cache.get_submissions(
+                    handle
+                )
                 if (sub.verdict == "OK" or sub.verdict == "TESTING")
                 and sub.problem.contestId == contest_id
                 and sub.problem.index == index
@@ -471,8 +472,9 @@ class Tournament(commands.Cog):
                 subs, key=lambda sub: sub.creationTimeSeconds
             ).creationTimeSeconds
 
-        challenger_time = await get_solve_time(challenger_id)
-        challengee_time = await get_solve_time(challengee_id)
+        with cf.uncached():
+            challenger_time = await get_solve_time(challenger_id)
+            challengee_time = await get_solve_time(challengee_id)
 
         if challenger_time == TESTING or challengee_time == TESTING:
             await ctx.send(
@@ -10,6 +10,7 @@ TEMP_DIR = os.path.join(DATA_DIR, "temp")
 
 USER_DB_FILE_PATH = os.path.join(DB_DIR, "user.db")
 CACHE_DB_FILE_PATH = os.path.join(DB_DIR, "cache.db")
+CACHE_SNAPSHOT_FILE_PATH = os.path.join(DB_DIR, "cache.snapshot")
 
 FONTS_DIR = os.path.join(ASSETS_DIR, "fonts")
 
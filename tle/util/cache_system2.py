@@ -1,8 +1,14 @@
 import asyncio
+import bisect
+import functools
 import logging
+import os
+import pickle
 import time
 from aiocache import cached
 
+import numpy as np
+
 from collections import defaultdict
 from discord.ext import commands
 
@@ -58,8 +64,8 @@ class ContestCache:
 
         self.logger = logging.getLogger(self.__class__.__name__)
 
-    async def run(self):
-        await self._try_disk()
+    async def run(self, snapshot=None):
+        await self._try_disk(snapshot)
         self._update_task.start()
 
     async def reload_now(self):
@@ -88,15 +94,19 @@ class ContestCache:
     def get_contests_in_phase(self, phase):
         return self.contests_by_phase[phase]
 
-    async def _try_disk(self):
+    async def _try_disk(self, snapshot=None):
         async with self.reload_lock:
-            contests = self.cache_master.conn.fetch_contests()
+            if snapshot is None:
+                contests = await self.cache_master.conn.aio.fetch_contests()
+            else:
+                contests = snapshot["contests"]
             if not contests:
                 self.logger.info("Contest cache on disk is empty.")
                 return
             await self._update(contests, from_api=False)
 
     @tasks.task_spec(name="ContestCacheUpdate")
+    @cf.prioritized(cf.Priority.MONITOR)
     async def _update_task(self, _):
         async with self.reload_lock:
             self.next_delay = await self._reload_contests()
@@ -120,11 +130,9 @@ class ContestCache:
         self.logger.info(
             f'{len(contests)} contests fetched from {"API" if from_api else "disk"}'
         )
-        contests.sort(key=lambda contest: (contest.startTimeSeconds, contest.id))
-
-        if from_api:
-            rc = self.cache_master.conn.cache_contests(contests)
-            self.logger.info(f"{rc} contests stored in database")
+        contests = sorted(
+            contests, key=lambda contest: (contest.startTimeSeconds, contest.id)
+        )
 
         contests_by_phase = {phase: [] for phase in cf.Contest.PHASES}
         contests_by_phase["_RUNNING"] = []
@@ -155,16 +163,100 @@ class ContestCache:
             # If any contest is running, reload at an increased rate to detect FINISHED
             delay = min(delay, self._ACTIVE_CONTEST_RELOAD_DELAY)
 
-        self.contests = contests
-        self.contests_by_phase = contests_by_phase
-        self.contest_by_id = contest_by_id
-        self.contests_last_cache = time.time()
+        async with self.cache_master.db_update_lock:
+            if from_api:
+                rc = await self.cache_master.conn.aio.cache_contests(contests)
+                self.logger.info(f"{rc} contests stored in database")
+            self.contests = contests
+            self.contests_by_phase = contests_by_phase
+            self.contest_by_id = contest_by_id
+            self.contests_last_cache = time.time()
+        if from_api:
+            self.cache_master.schedule_snapshot()
 
         cf_common.event_sys.dispatch(events.ContestListRefresh, self.contests.copy())
 
         return delay
 
 
+class ProblemIndex:
+    """Index over a list of problems, to search them by rating and tags
+    without scanning the whole list. Problems are referred to by position.
+    """
+
+    def __init__(self, problems, contest_by_id):
+        self.problems = problems
+        self.position_by_name = {}
+        self.positions_by_rating = defaultdict(set)
+        self.positions_by_tag = defaultdict(set)
+        self.nonstandard = set()
+        for pos, problem in enumerate(problems):
+            self.position_by_name[problem.name] = pos
+            self.positions_by_rating[problem.rating].add(pos)
+            for tag in problem.tags:
+                self.positions_by_tag[tag].add(pos)
+            # Problems of contests not known yet count as nonstandard until
+            # the index is rebuilt on the next contest list refresh.
+            contest = contest_by_id.get(problem.contestId)
+            if (
+                problem.tag_matches(["*special"])
+                or contest is None
+                or cf_common.is_nonstandard_contest(contest)
+            ):
+                self.nonstandard.add(pos)
+        self.ratings = sorted(self.positions_by_rating)
+        self.positions_by_query_tag = {}
+
+    def search(
+        self,
+        *,
+        min_rating=None,
+        max_rating=None,
+        tags=None,
+        exclude_names=(),
+        standard_only=False,
+    ):
+        """Returns the problems with rating in the given bounds, matching all
+        the tags as `Problem.tag_matches` does and not among the names to
+        exclude, in their order in the index.
+        """
+        lo = 0 if min_rating is None else bisect.bisect_left(self.ratings, min_rating)
+        hi = (
+            len(self.ratings)
+            if max_rating is None
+            else bisect.bisect_right(self.ratings, max_rating)
+        )
+        positions = set().union(
+            *(self.positions_by_rating[rating] for rating in self.ratings[lo:hi])
+        )
+        for tag in tags or ():
+            positions &= self._positions_matching_tag(tag)
+        if standard_only:
+            positions -= self.nonstandard
+        positions.difference_update(
+            self.position_by_name[name]
+            for name in exclude_names
+            if name in self.position_by_name
+        )
+        return [self.problems[pos] for pos in sorted(positions)]
+
+    def _positions_matching_tag(self, query_tag):
+        """Positions of problems with a tag containing the query tag."""
+        try:
+            return self.positions_by_query_tag[query_tag]
+        except KeyError:
+            pass
+        positions = set().union(
+            *(
+                tag_positions
+                for tag, tag_positions in self.positions_by_tag.items()
+                if query_tag in tag
+            )
+        )
+        self.positions_by_query_tag[query_tag] = positions
+        return positions
+
+
 class ProblemCache:
     _RELOAD_INTERVAL = 6 * 60 * 60
 
@@ -173,6 +265,7 @@ class ProblemCache:
 
         self.problems = []
         self.problem_by_name = {}
+        self.index = ProblemIndex([], {})
         self.problems_last_cache = 0
 
         self.reload_lock = asyncio.Lock()
@@ -180,9 +273,10 @@ class ProblemCache:
 
         self.logger = logging.getLogger(self.__class__.__name__)
 
-    async def run(self):
-        await self._try_disk()
+    async def run(self, snapshot=None):
+        await self._try_disk(snapshot)
         self._update_task.start()
+        self._reindex_task.start()
 
     async def reload_now(self):
         """Force a reload. If currently reloading it will wait until done."""
@@ -198,20 +292,25 @@ class ProblemCache:
         if self.reload_exception:
             raise self.reload_exception
 
-    async def _try_disk(self):
+    async def _try_disk(self, snapshot=None):
         async with self.reload_lock:
-            problems = self.cache_master.conn.fetch_problems()
+            if snapshot is None:
+                problems = await self.cache_master.conn.aio.fetch_problems()
+            else:
+                problems = snapshot["problems"]
             if not problems:
                 self.logger.info("Problem cache on disk is empty.")
                 return
             self.problems = problems
             self.problem_by_name = {problem.name: problem for problem in problems}
+            self._reindex()
             self.logger.info(f"{len(self.problems)} problems fetched from disk")
 
     @tasks.task_spec(
         name="ProblemCacheUpdate",
         waiter=tasks.Waiter.fixed_delay(_RELOAD_INTERVAL),
     )
+    @cf.prioritized(cf.Priority.MONITOR)
     async def _update_task(self, _):
         async with self.reload_lock:
             await self._reload_problems()
@@ -221,6 +320,22 @@ class ProblemCache:
     async def _update_task_exception_handler(self, ex):
         self.reload_exception = ex
 
+    @tasks.task_spec(
+        name="ProblemCacheReindex",
+        waiter=tasks.Waiter.for_event(events.ContestListRefresh, run_first=False),
+    )
+    async def _reindex_task(self, _):
+        # Whether a problem is standard depends on its contest.
+        self._reindex()
+
+    def search(self, **kwargs):
+        """Searches problems, see `ProblemIndex.search`."""
+        return self.index.search(**kwargs)
+
+    def _reindex(self):
+        contest_by_id = self.cache_master.contest_cache.contest_by_id
+        self.index = ProblemIndex(self.problems, contest_by_id)
+
     async def _reload_problems(self):
         problems, _ = await cf.problemset.problems()
         await self._update(problems)
@@ -246,10 +361,12 @@ class ProblemCache:
 
         self.problems = list(problem_by_name.values())
         self.problem_by_name = problem_by_name
+        self._reindex()
         self.problems_last_cache = time.time()
 
-        rc = self.cache_master.conn.cache_problems(self.problems)
+        rc = await self.cache_master.conn.aio.cache_problems(self.problems)
         self.logger.info(f"{rc} problems stored in database")
+        self.cache_master.schedule_snapshot()
 
 
 class ProblemsetCacheError(CacheError):
@@ -273,12 +390,16 @@ class ProblemsetCache:
         self.update_lock = asyncio.Lock()
         self.logger = logging.getLogger(self.__class__.__name__)
 
-    async def run(self):
+    async def run(self, snapshot=None):
         if self.cache_master.conn.problemset_empty():
             self.logger.warning(
                 "Problemset cache on disk is empty. This must be populated "
                 "manually before use."
             )
+        if snapshot is None:
+            await self._update_from_disk()
+        else:
+            self.problems, self.problem_to_contests = snapshot["problemset"]
         self._update_task.start()
 
     async def update_for_contest(self, contest_id):
@@ -286,29 +407,28 @@ class ProblemsetCache:
         async with self.update_lock:
             contest = self.cache_master.contest_cache.get_contest(contest_id)
             problemset, _ = await self._fetch_problemsets([contest], force_fetch=True)
-            self.cache_master.conn.clear_problemset(contest_id)
-            self._save_problems(problemset)
+            await self._save_problems(problemset, clear_contest_id=contest_id)
             return len(problemset)
 
+    @cf.prioritized(cf.Priority.BULK)
     async def update_for_all(self):
         """Update problemsets for all finished contests. Intended for manual trigger."""
         async with self.update_lock:
             contests = self.cache_master.contest_cache.contests_by_phase["FINISHED"]
             problemsets, _ = await self._fetch_problemsets(contests, force_fetch=True)
-            self.cache_master.conn.clear_problemset()
-            self._save_problems(problemsets)
+            await self._save_problems(problemsets, clear_all=True)
             return len(problemsets)
 
     @tasks.task_spec(
         name="ProblemsetCacheUpdate",
         waiter=tasks.Waiter.fixed_delay(_RELOAD_DELAY),
     )
+    @cf.prioritized(cf.Priority.BULK)
     async def _update_task(self, _):
         async with self.update_lock:
             contests = self.cache_master.contest_cache.contests_by_phase["FINISHED"]
             new_problems, updated_problems = await self._fetch_problemsets(contests)
-            self._save_problems(new_problems + updated_problems)
-            self._update_from_disk()
+            await self._save_problems(new_problems + updated_problems)
             self.logger.info(
                 f"{len(new_problems)} new problems saved and {len(updated_problems)} "
                 "saved problems updated."
@@ -325,18 +445,16 @@ class ProblemsetCache:
             new_contest_ids = [contest.id for contest in contests]
         else:
             now = time.time()
+            summaries = await self.cache_master.conn.aio.get_problemset_summaries()
             for contest in contests:
                 if now > contest.end_time + self._MONITOR_PERIOD_SINCE_CONTEST_END:
                     # Contest too old, we do not want to check it.
                     continue
-                problemset = self.cache_master.conn.fetch_problemset(contest.id)
-                if not problemset:
+                if contest.id not in summaries:
                     new_contest_ids.append(contest.id)
                     continue
-                rated_problem_idx = {
-                    prob.index for prob in problemset if prob.rating is not None
-                }
-                if len(rated_problem_idx) < len(problemset):
+                problem_count, rated_problem_idx = summaries[contest.id]
+                if len(rated_problem_idx) < problem_count:
                     contests_to_refetch.append((contest.id, rated_problem_idx))
 
         new_problems, updated_problems = [], []
@@ -363,9 +481,16 @@ class ProblemsetCache:
             problemset = []
         return problemset
 
-    def _save_problems(self, problems):
-        rc = self.cache_master.conn.cache_problemset(problems)
-        self.logger.info(f"Saved {rc} problems to database.")
+    async def _save_problems(self, problems, *, clear_contest_id=None, clear_all=False):
+        conn = self.cache_master.conn.aio
+        async with self.cache_master.db_update_lock:
+            # Cleared in the same transaction as the problems are saved in.
+            if clear_all or clear_contest_id is not None:
+                await conn.clear_problemset(clear_contest_id)
+            rc = await conn.cache_problemset(problems)
+            self.logger.info(f"Saved {rc} problems to database.")
+            await self._update_from_disk()
+        self.cache_master.schedule_snapshot()
 
     def get_problemset(self, contest_id):
         problemset = self.cache_master.conn.fetch_problemset(contest_id)
@@ -373,8 +498,8 @@ class ProblemsetCache:
             raise ProblemsetNotCached(contest_id)
         return problemset
 
-    def _update_from_disk(self):
-        self.problems = self.cache_master.conn.fetch_problems2()
+    async def _update_from_disk(self):
+        self.problems = await self.cache_master.conn.aio.fetch_problems2()
         self.problem_to_contests = defaultdict(list)
         for problem in self.problems:
             try:
@@ -393,10 +518,21 @@ class RatingChangesCache:
         self.cache_master = cache_master
         self.monitored_contests = []
         self.handle_rating_cache = {}
+        # Per handle arrays, aligned with `handles`, and all ratings sorted.
+        # Updated with `handle_rating_cache`.
+        self.handles = []
+        self.index_by_handle = {}
+        self.ratings = np.array([], dtype=int)
+        self.contest_counts = np.array([], dtype=int)
+        self.last_update_times = np.array([], dtype=int)
+        self.sorted_ratings = np.array([], dtype=int)
         self.logger = logging.getLogger(self.__class__.__name__)
 
-    async def run(self):
-        self._refresh_handle_cache()
+    async def run(self, snapshot=None):
+        if snapshot is None:
+            await self._load_handle_cache()
+        else:
+            self._set_handle_cache(*snapshot["handle_ratings"])
         if not self.handle_rating_cache:
             self.logger.warning(
                 "Rating changes cache on disk is empty. This must be populated "
@@ -408,29 +544,28 @@ class RatingChangesCache:
         """Fetch rating changes for a particular contest. Intended for manual trigger."""
         contest = self.cache_master.contest_cache.contest_by_id[contest_id]
         changes = await self._fetch([contest])
-        self.cache_master.conn.clear_rating_changes(contest_id=contest_id)
-        self._save_changes(changes)
+        await self._save_changes(changes, rebuild=True, clear_contest_id=contest_id)
         return len(changes)
 
+    @cf.prioritized(cf.Priority.BULK)
     async def fetch_all_contests(self):
         """Fetch rating changes for all contests. Intended for manual trigger."""
         contests = self.cache_master.contest_cache.contests_by_phase["FINISHED"]
         changes = await self._fetch(contests)
-        self.cache_master.conn.clear_rating_changes()
-        self._save_changes(changes)
+        await self._save_changes(changes, rebuild=True, clear_all=True)
         return len(changes)
 
+    @cf.prioritized(cf.Priority.BULK)
     async def fetch_missing_contests(self):
         """Fetch rating changes for contests which are not saved in database. Intended for
         manual trigger."""
         contests = self.cache_master.contest_cache.contests_by_phase["FINISHED"]
-        contests = [
-            contest
-            for contest in contests
-            if not self.has_rating_changes_saved(contest.id)
-        ]
+        saved_ids = (
+            await self.cache_master.conn.aio.get_contest_ids_with_rating_changes()
+        )
+        contests = [contest for contest in contests if contest.id not in saved_ids]
         changes = await self._fetch(contests)
-        self._save_changes(changes)
+        await self._save_changes(changes)
         return len(changes)
 
     def is_newly_finished_without_rating_changes(self, contest):
@@ -473,6 +608,7 @@ class RatingChangesCache:
         name="RatingChangesCacheUpdate.MonitorNewlyFinishedContests",
         waiter=tasks.Waiter.fixed_delay(_RELOAD_DELAY),
     )
+    @cf.prioritized(cf.Priority.MONITOR)
     async def _monitor_task(self, _):
         self.monitored_contests = [
             contest
@@ -491,7 +627,7 @@ class RatingChangesCache:
         # Sort by the rating update time of the first change in the list of changes, assuming
         # every change in the list has the same time.
         contest_changes_pairs.sort(key=lambda pair: pair[1][0].ratingUpdateTimeSeconds)
-        self._save_changes(contest_changes_pairs)
+        await self._save_changes(contest_changes_pairs)
         for contest, changes in contest_changes_pairs:
             cf_common.event_sys.dispatch(
                 events.RatingChangesUpdate,
@@ -516,32 +652,132 @@ class RatingChangesCache:
                 pass
         return all_changes
 
-    def _save_changes(self, contest_changes_pairs):
-        flattened = [
-            change for _, changes in contest_changes_pairs for change in changes
-        ]
-        if not flattened:
-            return
-        rc = self.cache_master.conn.save_rating_changes(flattened)
-        self.logger.info(f"Saved {rc} changes to database.")
-        self._refresh_handle_cache()
+    async def _save_changes(
+        self,
+        contest_changes_pairs,
+        *,
+        rebuild=False,
+        clear_contest_id=None,
+        clear_all=False,
+    ):
+        """Saves the changes and adds them to the handle ratings. Changes of
+        contests that already have changes saved are skipped, so that none are
+        counted twice. With `rebuild`, all changes are saved and the handle
+        ratings are recomputed from scratch instead, after clearing the saved
+        changes of the given contest or of all contests.
+        """
+        conn = self.cache_master.conn.aio
+        async with self.cache_master.db_update_lock:
+            if clear_all or clear_contest_id is not None:
+                await conn.clear_rating_changes(contest_id=clear_contest_id)
+            if not rebuild:
+                contest_changes_pairs = [
+                    (contest, changes)
+                    for contest, changes in contest_changes_pairs
+                    if not await conn.has_rating_changes_saved(contest.id)
+                ]
+            flattened = [
+                change for _, changes in contest_changes_pairs for change in changes
+            ]
+            if flattened:
+                rc = await conn.save_rating_changes(flattened)
+                self.logger.info(f"Saved {rc} changes to database.")
+            if rebuild:
+                await self._refresh_handle_cache()
+            elif flattened:
+                await self._apply_changes(flattened)
+        self.cache_master.schedule_snapshot()
+
+    async def _load_handle_cache(self):
+        conn = self.cache_master.conn.aio
+        handle_ratings = await conn.get_handle_ratings()
+        # Every rating change is counted for exactly one handle, so the counts
+        # tell whether the table was never built or missed some changes.
+        contest_count = sum(row[2] for row in handle_ratings)
+        if contest_count != await conn.get_rating_change_count():
+            self.logger.info("Handle ratings are out of date, rebuilding.")
+            await conn.rebuild_handle_ratings(cf.DEFAULT_RATING)
+            handle_ratings = await conn.get_handle_ratings()
+        self._set_handle_cache(*self._columns(handle_ratings))
+
+    async def _refresh_handle_cache(self):
+        conn = self.cache_master.conn.aio
+        await conn.rebuild_handle_ratings(cf.DEFAULT_RATING)
+        self._set_handle_cache(*self._columns(await conn.get_handle_ratings()))
 
-    def _refresh_handle_cache(self):
-        changes = self.cache_master.conn.get_all_rating_changes()
-        handle_rating_cache = {}
+    @staticmethod
+    def _columns(handle_ratings):
+        return zip(*handle_ratings) if handle_ratings else ((), (), (), ())
+
+    def _set_handle_cache(self, handles, ratings, contest_counts, last_update_times):
+        self.handles = list(handles)
+        self.handle_rating_cache = dict(zip(self.handles, map(int, ratings)))
+        self.index_by_handle = {handle: i for i, handle in enumerate(handles)}
+        self.ratings = np.array(ratings, dtype=int)
+        self.contest_counts = np.array(contest_counts, dtype=int)
+        self.last_update_times = np.array(last_update_times, dtype=int)
+        self.sorted_ratings = np.sort(self.ratings)
+        self.logger.info(f"Ratings for {len(self.handles)} handles cached")
+
+    async def _apply_changes(self, changes):
+        """Adds newly saved changes to the handle ratings, in memory and in the
+        handle_rating table.
+        """
         for change in changes:
-            delta = change.newRating - change.oldRating
-            try:
-                handle_rating_cache[change.handle] += delta
-            except KeyError:
-                handle_rating_cache[change.handle] = cf.DEFAULT_RATING + delta
-        self.handle_rating_cache = handle_rating_cache
-        self.logger.info(f"Ratings for {len(handle_rating_cache)} handles cached")
+            if change.handle not in self.index_by_handle:
+                self.index_by_handle[change.handle] = len(self.handles)
+                self.handles.append(change.handle)
+        added = len(self.handles) - len(self.ratings)
+        # The arrays are replaced rather than updated in place, as they may
+        # have been handed out.
+        ratings = np.concatenate(
+            (self.ratings, np.full(added, cf.DEFAULT_RATING, dtype=int))
+        )
+        contest_counts = np.concatenate(
+            (self.contest_counts, np.zeros(added, dtype=int))
+        )
+        last_update_times = np.concatenate(
+            (self.last_update_times, np.zeros(added, dtype=int))
+        )
+        ix = np.array([self.index_by_handle[change.handle] for change in changes])
+        deltas = [change.newRating - change.oldRating for change in changes]
+        update_times = [change.ratingUpdateTimeSeconds for change in changes]
+        np.add.at(ratings, ix, deltas)
+        np.add.at(contest_counts, ix, 1)
+        np.maximum.at(last_update_times, ix, update_times)
+        self.ratings = ratings
+        self.contest_counts = contest_counts
+        self.last_update_times = last_update_times
+        self.sorted_ratings = np.sort(ratings)
+
+        handle_ratings = []
+        for i in np.unique(ix):
+            handle = self.handles[i]
+            self.handle_rating_cache[handle] = int(ratings[i])
+            handle_ratings.append(
+                (
+                    handle,
+                    int(ratings[i]),
+                    int(contest_counts[i]),
+                    int(last_update_times[i]),
+                )
+            )
+        await self.cache_master.conn.aio.save_handle_ratings(handle_ratings)
+        self.logger.info(f"Ratings for {len(handle_ratings)} handles updated")
+
+    def _active_mask(self, time_cutoff, n):
+        return (self.contest_counts >= n) & (self.last_update_times >= time_cutoff)
 
     def get_users_with_more_than_n_contests(self, time_cutoff, n):
-        return self.cache_master.conn.get_users_with_more_than_n_contests(
-            time_cutoff, n
-        )
+        """Returns handles with at least n rated contests, the last of which
+        was rated at or after `time_cutoff`."""
+        mask = self._active_mask(time_cutoff, n)
+        return [self.handles[i] for i in np.flatnonzero(mask)]
+
+    def get_ratings_of_users_with_more_than_n_contests(self, time_cutoff, n):
+        """Returns the current ratings of the handles returned by
+        `get_users_with_more_than_n_contests` as an array."""
+        return self.ratings[self._active_mask(time_cutoff, n)]
 
     def get_rating_changes_for_contest(self, contest_id):
         return self.cache_master.conn.get_rating_changes_for_contest(contest_id)
@@ -558,7 +794,13 @@ class RatingChangesCache:
         )
 
     def get_all_ratings(self):
-        return list(self.handle_rating_cache.values())
+        """Returns the current ratings of all handles as a sorted array."""
+        return self.sorted_ratings
+
+    def get_rating_percentile(self, rating):
+        """Returns the percentage of handles rated strictly below `rating`."""
+        ix = np.searchsorted(self.sorted_ratings, rating)
+        return 100 * ix / len(self.sorted_ratings)
 
 
 class RanklistCacheError(CacheError):
@@ -618,6 +860,7 @@ class RanklistCache:
         name="RanklistCacheUpdate.MonitorActiveContests",
         waiter=tasks.Waiter.fixed_delay(_RELOAD_DELAY),
     )
+    @cf.prioritized(cf.Priority.MONITOR)
     async def _monitor_task(self, _):
         cache = self.cache_master.rating_changes_cache
         self.monitored_contests = [
@@ -642,8 +885,17 @@ class RanklistCache:
             self.ranklist_by_contest[contest_id] = ranklist
 
     async def generate_ranklist(
-        self, contest_id, *, fetch_changes=False, predict_changes=False
+        self,
+        contest_id,
+        *,
+        fetch_changes=False,
+        predict_changes=False,
+        previous=None,
     ):
+        """Fetches the ranklist of the contest including unofficial
+        participants. If `previous` is given, its predicted rating changes are
+        reused when the standings they depend on have not changed.
+        """
         assert fetch_changes ^ predict_changes
 
         contest, problems, standings = await cf.contest.standings(
@@ -680,7 +932,11 @@ class RanklistCache:
         elif predict_changes:
             # Rating changes have not been applied yet, predict rating changes.
             # For running/recent contests.
-            _, _, standings_official = await cf.contest.standings(contest_id=contest_id)
+            # Official participants are exactly the contestants, so their
+            # standings need not be fetched separately.
+            standings_official = [
+                row for row in standings if row.party.participantType == "CONTESTANT"
+            ]
 
             has_teams = any(row.party.teamId is not None for row in standings_official)
             if cf_common.is_nonstandard_contest(contest) or has_teams:
@@ -705,7 +961,7 @@ class RanklistCache:
                         if rating < 2100
                     }
                 ranklist = Ranklist(contest, problems, standings, now, is_rated=True)
-                ranklist.predict(current_rating)
+                ranklist.predict(current_rating, previous)
 
         return ranklist
 
@@ -714,7 +970,9 @@ class RanklistCache:
         for contest in contests:
             try:
                 ranklist = await self.generate_ranklist(
-                    contest.id, predict_changes=True
+                    contest.id,
+                    predict_changes=True,
+                    previous=self.ranklist_by_contest.get(contest.id),
                 )
                 ranklist_by_contest[contest.id] = ranklist
                 self.logger.info(f"Ranklist fetched for contest {contest.id}")
@@ -726,21 +984,303 @@ class RanklistCache:
         return ranklist_by_contest
 
 
+class ParticipationCache:
+    """Caches the individual participants of finished contests, with their rating
+    changes, in the database. Unlike a ranklist, this is all that is kept, and a
+    contest is fetched only once as it does not change after rating changes are
+    applied, or after it has been unrated for long enough."""
+
+    def __init__(self, cache_master):
+        self.cache_master = cache_master
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    async def get_participants(self, contests, handles):
+        """Returns a dict of contest id to a dict of handle to (old rating, new rating)
+        for each of the handles which took part in the contest, the ratings being None
+        if it had no rating change. The participants of contests not saved yet are
+        fetched concurrently and the first error encountered, if any, is raised."""
+        conn = self.cache_master.conn.aio
+        saved_ids = await conn.get_contest_ids_with_participants()
+        missing = [contest for contest in contests if contest.id not in saved_ids]
+        fetched = await self._fetch(missing)
+
+        handle_set = set(handles)
+        participants_by_contest = {}
+        for contest in contests:
+            if contest.id in fetched:
+                participants = [
+                    participant
+                    for participant in fetched[contest.id]
+                    if participant[0] in handle_set
+                ]
+            else:
+                participants = await conn.get_contest_participants(contest.id, handles)
+            participants_by_contest[contest.id] = {
+                handle: (old_rating, new_rating)
+                for handle, old_rating, new_rating in participants
+            }
+        return participants_by_contest
+
+    async def clear(self, contest_id=None):
+        """Drops saved participants so that they are fetched afresh."""
+        return await self.cache_master.conn.aio.clear_contest_participants(contest_id)
+
+    async def _fetch(self, contests):
+        async def fetch_one(contest):
+            try:
+                return await self._fetch_contest(contest)
+            except cf.CodeforcesApiError as e:
+                return e
+
+        results = await asyncio.gather(*map(fetch_one, contests))
+        now = time.time()
+        participants_by_contest = {}
+        to_save = []
+        for contest, result in zip(contests, results):
+            if isinstance(result, cf.CodeforcesApiError):
+                continue
+            participants, is_rated = result
+            participants_by_contest[contest.id] = participants
+            # Rating changes may yet be applied to a recent contest.
+            if is_rated or now - contest.end_time >= RatingChangesCache._RATED_DELAY:
+                to_save.append((contest.id, participants))
+        if to_save:
+            await self.cache_master.conn.aio.save_contest_participants(to_save)
+            self.logger.info(f"Saved participants of {len(to_save)} contests.")
+        cf.unwrap_results(results)
+        return participants_by_contest
+
+    async def _fetch_contest(self, contest):
+        _, _, standings = await cf.contest.standings(
+            contest_id=contest.id, show_unofficial=True
+        )
+        try:
+            changes = await cf.contest.ratingChanges(contest_id=contest.id)
+        except cf.RatingChangesUnavailableError:
+            changes = []
+        change_by_handle = {change.handle: change for change in changes}
+        # As in a ranklist, excluding PRACTICE and MANAGER, and teams.
+        handles = {
+            row.party.members[0].handle
+            for row in standings
+            if row.party.participantType
+            in ("CONTESTANT", "OUT_OF_COMPETITION", "VIRTUAL")
+            and not row.party.ghost
+            and row.party.teamId is None
+        }
+        participants = []
+        for handle in handles:
+            change = change_by_handle.get(handle)
+            if change is None:
+                participants.append((handle, None, None))
+            else:
+                participants.append((handle, change.oldRating, change.newRating))
+        self.logger.info(
+            f"{len(participants)} participants fetched for contest {contest.id}"
+        )
+        return participants, len(changes) > 0
+
+
+class SubmissionCache:
+    """Caches the submissions of every handle queried. Once a handle is cached, only the
+    submissions newer than those saved are fetched, a page at a time."""
+
+    _INITIAL_FETCH_COUNT = 20
+    _MAX_FETCH_COUNT = 1000
+    _PENDING_VERDICTS = (None, "TESTING")
+    # Verdicts may still change for this long after a submission, e.g. on rejudges.
+    _REJUDGE_WINDOW = 24 * 60 * 60
+
+    def __init__(self, cache_master):
+        self.cache_master = cache_master
+        self.lock_by_handle = defaultdict(asyncio.Lock)
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    async def get_submissions(self, handle, *, complete_before=None):
+        """Returns all submissions of the handle, most recent first. If
+        `complete_before` is given, only the submissions made before that time need be
+        up to date, and the saved ones are returned as is when they must include them
+        with their final verdicts."""
+        key = handle.lower()
+        async with self.lock_by_handle[key]:
+            saved = await self.cache_master.conn.aio.fetch_submissions(key)
+            if saved and complete_before is not None:
+                # Saved submissions are complete up to the newest of them, and final
+                # once none of those before `complete_before` is still being judged.
+                newest_time = max(sub.creationTimeSeconds for sub in saved)
+                pending = any(
+                    sub.creationTimeSeconds < complete_before
+                    and sub.verdict in self._PENDING_VERDICTS
+                    for sub in saved
+                )
+                if (
+                    not pending
+                    and newest_time >= complete_before + self._REJUDGE_WINDOW
+                ):
+                    return saved
+            if not saved:
+                submissions = new_submissions = await cf.user.status(handle=handle)
+            else:
+                boundary = self._refetch_boundary(saved)
+                new_submissions = await self._fetch_since(handle, boundary)
+                submission_by_id = {sub.id: sub for sub in saved}
+                submission_by_id.update((sub.id, sub) for sub in new_submissions)
+                submissions = sorted(
+                    submission_by_id.values(), key=lambda sub: sub.id, reverse=True
+                )
+            if new_submissions:
+                rc = await self.cache_master.conn.aio.cache_submissions(
+                    key, new_submissions
+                )
+                self.logger.info(f"Saved {rc} submissions of {handle} to database.")
+        return submissions
+
+    async def get_submissions_for_handles(self, handles, *, complete_before=None):
+        """Returns the submissions of every handle, in order. The handles are queried
+        concurrently and the first error encountered, if any, is raised."""
+        query = functools.partial(self.get_submissions, complete_before=complete_before)
+        results = await cf.query_for_handles(query, handles)
+        return cf.unwrap_results(results)
+
+    async def clear(self, handle=None):
+        """Drops saved submissions so that they are fetched afresh, e.g. after a rejudge."""
+        return await self.cache_master.conn.aio.clear_submissions(
+            handle.lower() if handle is not None else None
+        )
+
+    def _refetch_boundary(self, saved):
+        # Submissions still being judged must be fetched again to get their final
+        # verdict, however long ago they were saved.
+        pending_ids = [
+            sub.id for sub in saved if sub.verdict in self._PENDING_VERDICTS
+        ]
+        return min(pending_ids, default=max(sub.id for sub in saved))
+
+    async def _fetch_since(self, handle, boundary):
+        """Fetch submissions with id at least `boundary`, newest first, in growing pages."""
+        submission_by_id = {}
+        from_, count = 1, self._INITIAL_FETCH_COUNT
+        while True:
+            submissions = await cf.user.status(handle=handle, from_=from_, count=count)
+            submission_by_id.update((sub.id, sub) for sub in submissions)
+            if len(submissions) < count or submissions[-1].id <= boundary:
+                break
+            from_ += count
+            count = min(2 * count, self._MAX_FETCH_COUNT)
+        return [sub for sub in submission_by_id.values() if sub.id >= boundary]
+
+
+def _write_snapshot(path, snapshot):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
+
+
 class CacheSystem:
-    def __init__(self, conn):
+    # Bump when the contents of the snapshot change.
+    _SNAPSHOT_VERSION = 1
+    # Refreshes within this many seconds of each other share a snapshot.
+    _SNAPSHOT_DELAY = 10
+
+    def __init__(self, conn, snapshot_path=None):
+        """If `snapshot_path` is given, the in-memory state of the caches is
+        saved there after every refresh, and restored from there on startup
+        instead of from the database if it is up to date.
+        """
         self.conn = conn
+        self.snapshot_path = snapshot_path
+        # Held from a write to the database until the caches reflect it, so
+        # that snapshots match the generation they are saved with.
+        self.db_update_lock = asyncio.Lock()
+        self.snapshot_task = None
         self.contest_cache = ContestCache(self)
         self.problem_cache = ProblemCache(self)
         self.rating_changes_cache = RatingChangesCache(self)
         self.ranklist_cache = RanklistCache(self)
         self.problemset_cache = ProblemsetCache(self)
+        self.submission_cache = SubmissionCache(self)
+        self.participation_cache = ParticipationCache(self)
+        self.logger = logging.getLogger(self.__class__.__name__)
 
     async def run(self):
-        await self.rating_changes_cache.run()
+        begin = time.perf_counter()
+        snapshot = self._load_snapshot()
+        await self.rating_changes_cache.run(snapshot)
         await self.ranklist_cache.run()
-        await self.contest_cache.run()
-        await self.problem_cache.run()
-        await self.problemset_cache.run()
+        await self.contest_cache.run(snapshot)
+        await self.problem_cache.run(snapshot)
+        await self.problemset_cache.run(snapshot)
+        source = "database" if snapshot is None else "snapshot"
+        elapsed = time.perf_counter() - begin
+        self.logger.info(f"Caches loaded from {source} in {elapsed:.2f}s")
+
+    def schedule_snapshot(self):
+        """Saves a snapshot of the caches shortly, unless one is already
+        scheduled.
+        """
+        if self.snapshot_path is None:
+            return
+        if self.snapshot_task is None or self.snapshot_task.done():
+            self.snapshot_task = asyncio.create_task(self._save_snapshot())
+
+    def _load_snapshot(self):
+        if self.snapshot_path is None:
+            return None
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                snapshot = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            self.logger.exception("Failed to read cache snapshot, ignoring.")
+            return None
+        if (
+            snapshot.get("version") != self._SNAPSHOT_VERSION
+            or snapshot.get("generation") != self.conn.get_generation()
+        ):
+            self.logger.info("Cache snapshot is out of date, ignoring.")
+            return None
+        return snapshot
+
+    def _take_snapshot(self):
+        rating_changes_cache = self.rating_changes_cache
+        problemset_cache = self.problemset_cache
+        return {
+            "version": self._SNAPSHOT_VERSION,
+            "generation": self.conn.get_generation(),
+            "contests": self.contest_cache.contests,
+            "problems": self.problem_cache.problems,
+            # The list of handles is appended to in place, the rest replaced.
+            "handle_ratings": (
+                list(rating_changes_cache.handles),
+                rating_changes_cache.ratings,
+                rating_changes_cache.contest_counts,
+                rating_changes_cache.last_update_times,
+            ),
+            "problemset": (
+                problemset_cache.problems,
+                problemset_cache.problem_to_contests,
+            ),
+        }
+
+    async def _save_snapshot(self):
+        await asyncio.sleep(self._SNAPSHOT_DELAY)
+        # A database written before generations were counted is at generation
+        # 0, so a snapshot at generation 0 could match a different database.
+        if self.conn.get_generation() == 0:
+            return
+        async with self.db_update_lock:
+            snapshot = self._take_snapshot()
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                None, _write_snapshot, self.snapshot_path, snapshot
+            )
+        except Exception:
+            self.logger.exception("Failed to write cache snapshot.")
+            return
+        self.logger.info(f"Cache snapshot saved at generation {snapshot['generation']}")
 
     @staticmethod
     @cached(ttl=30 * 60)
@@ -1,8 +1,17 @@
 import asyncio
+import codecs
+import contextlib
+import contextvars
+import json
 import logging
+import pickle
+import re
 import time
 import functools
-from collections import namedtuple, deque
+from collections import namedtuple, deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from enum import IntEnum
 from tle.util.paginator import chunkify
 
 import aiohttp
@@ -172,7 +181,7 @@ ProblemStatistics = namedtuple(
 )
 
 Submission = namedtuple(
-    "Submissions",
+    "Submission",
     "id contestId problem author programmingLanguage verdict creationTimeSeconds",
 )
 
@@ -191,6 +200,54 @@ def make_from_dict(namedtuple_cls, dict_):
     return namedtuple_cls._make(field_vals)
 
 
+def _make_all(namedtuple_cls, dicts):
+    return [make_from_dict(namedtuple_cls, dict_) for dict_ in dicts]
+
+
+# Converters of API results are module level, so that they pickle and compare
+# equal across queries.
+_make_contests = functools.partial(_make_all, Contest)
+_make_rating_changes = functools.partial(_make_all, RatingChange)
+_make_users = functools.partial(_make_all, User)
+
+
+def _make_user(user_dict):
+    return make_from_dict(User, user_dict)
+
+
+def _make_problemset(result):
+    problems = _make_all(Problem, result["problems"])
+    problemstats = _make_all(ProblemStatistics, result["problemStatistics"])
+    return problems, problemstats
+
+
+def _make_submissions(result):
+    return [_make_submission(submission) for submission in result]
+
+
+def _make_submission(submission):
+    submission["problem"] = make_from_dict(Problem, submission["problem"])
+    submission["author"]["members"] = [
+        make_from_dict(Member, member)
+        for member in submission["author"]["members"]
+    ]
+    submission["author"] = make_from_dict(Party, submission["author"])
+    return make_from_dict(Submission, submission)
+
+
+def _make_ranklist_row(row):
+    party = row["party"]
+    party["members"] = [
+        make_from_dict(Member, member) for member in party["members"]
+    ]
+    row["party"] = make_from_dict(Party, party)
+    row["problemResults"] = [
+        make_from_dict(ProblemResult, problem_result)
+        for problem_result in row["problemResults"]
+    ]
+    return make_from_dict(RanklistRow, row)
+
+
 # Error classes
 
 
@@ -264,29 +321,150 @@ def _bool_to_str(value):
     raise TypeError(f"Expected bool, got {value} of type {type(value)}")
 
 
-def cf_ratelimit(f):
+class Priority(IntEnum):
+    """Priority lanes of the request scheduler, most urgent first."""
+
+    INTERACTIVE = 0
+    MONITOR = 1
+    BULK = 2
+
+
+_priority = contextvars.ContextVar("cf_priority", default=Priority.INTERACTIVE)
+
+
+@contextlib.contextmanager
+def priority(priority_):
+    """Queries made under this context manager, including from tasks created
+    within it, are scheduled with the given priority.
+    """
+    token = _priority.set(priority_)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def prioritized(priority_):
+    """Returns a decorator that runs the decorated coroutine function under
+    `priority(priority_)`.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapped(*args, **kwargs):
+            with priority(priority_):
+                return await func(*args, **kwargs)
+
+        return wrapped
+
+    return decorator
+
+
+LaneStats = namedtuple("LaneStats", "queued served mean_wait max_wait")
+
+
+class RequestScheduler:
+    """Token bucket rate limiter for API queries. Waiting queries are let
+    through strictly in order of priority, first come first served within a
+    priority. Exceeding the call limit pauses all queries, for twice as long
+    each consecutive time.
+    """
+
+    def __init__(self, rate, capacity, *, max_backoff=60):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_backoff = max_backoff
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self.backoff = 0
+        self.paused_until = 0
+        self.limit_exceeded_count = 0
+        self.waiters = {priority_: deque() for priority_ in Priority}
+        self.served = {priority_: 0 for priority_ in Priority}
+        self.total_wait = {priority_: 0.0 for priority_ in Priority}
+        self.max_wait = {priority_: 0.0 for priority_ in Priority}
+        self.dispatcher = None
+
+    async def acquire(self, priority_):
+        future = asyncio.get_running_loop().create_future()
+        self.waiters[priority_].append((future, time.monotonic()))
+        if self.dispatcher is None or self.dispatcher.done():
+            self.dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    def on_success(self):
+        self.backoff /= 2
+
+    def on_limit_exceeded(self):
+        self.limit_exceeded_count += 1
+        self.backoff = min(max(2 * self.backoff, 1), self.max_backoff)
+        self.paused_until = time.monotonic() + self.backoff
+        self.tokens = 0
+
+    def stats(self):
+        return {
+            priority_: LaneStats(
+                len(self.waiters[priority_]),
+                self.served[priority_],
+                self.total_wait[priority_] / max(self.served[priority_], 1),
+                self.max_wait[priority_],
+            )
+            for priority_ in Priority
+        }
+
+    def _next_lane(self):
+        for priority_, waiters in self.waiters.items():
+            while waiters and waiters[0][0].cancelled():
+                waiters.popleft()
+            if waiters:
+                return priority_
+        return None
+
+    async def _dispatch(self):
+        while True:
+            priority_ = self._next_lane()
+            if priority_ is None:
+                return
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            self.tokens = min(
+                self.capacity,
+                self.tokens + (now - self.last_refill) * self.rate,
+            )
+            self.last_refill = now
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                continue
+
+            future, enqueue_time = self.waiters[priority_].popleft()
+            self.tokens -= 1
+            wait = now - enqueue_time
+            self.served[priority_] += 1
+            self.total_wait[priority_] += wait
+            self.max_wait[priority_] = max(self.max_wait[priority_], wait)
+            future.set_result(None)
+
+
+# A capacity of 1 spaces out queries evenly, bursts risk hitting the limit.
+scheduler = RequestScheduler(rate=5, capacity=1)
+
+
+def cf_scheduled(f):
     tries = 3
-    per_second = 5
-    last = deque([0] * per_second)
 
     @functools.wraps(f)
     async def wrapped(*args, **kwargs):
         for i in range(tries):
-            now = time.time()
-
-            # Next valid slot is 1s after the `per_second`th last request
-            next_valid = max(now, 1 + last[0])
-            last.append(next_valid)
-            last.popleft()
-
-            # Delay as needed
-            delay = next_valid - now
-            if delay > 0:
-                await asyncio.sleep(delay)
-
+            await scheduler.acquire(_priority.get())
             try:
-                return await f(*args, **kwargs)
+                result = await f(*args, **kwargs)
+                scheduler.on_success()
+                return result
             except (ClientError, CallLimitExceededError) as e:
+                if isinstance(e, CallLimitExceededError):
+                    scheduler.on_limit_exceeded()
                 logger.info(f"Try {i+1}/{tries} at query failed.")
                 logger.info(repr(e))
                 if i < tries - 1:
@@ -298,31 +476,435 @@ def cf_ratelimit(f):
     return wrapped
 
 
-@cf_ratelimit
-async def _query_api(path, params=None):
+def _query_key(path, params):
+    return path, tuple(sorted(params.items())) if params else ()
+
+
+CacheStats = namedtuple("CacheStats", "entries size hits misses")
+
+
+class ResponseCache:
+    """LRU cache of API results, bounded by the total size in bytes of the
+    responses they were decoded from. Only results of paths with a TTL are
+    cached, for that many seconds.
+    """
+
+    def __init__(self, ttl_by_path, max_size):
+        self.ttl_by_path = ttl_by_path
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Returns the cached result for the key, or None if absent or
+        expired.
+        """
+        entry = self.entries.get(key)
+        if entry is None or entry[2] < time.monotonic():
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, result, size):
+        ttl = self.ttl_by_path.get(key[0])
+        if ttl is None or size > self.max_size:
+            return
+        self._discard(key)
+        self.entries[key] = (result, size, time.monotonic() + ttl)
+        self.size += size
+        while self.size > self.max_size:
+            self._discard(next(iter(self.entries)))
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def stats(self):
+        return CacheStats(len(self.entries), self.size, self.hits, self.misses)
+
+    def _discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+
+# Seconds for which results of each path are reused. Submissions and standings
+# change quickly, rating history and the problemset only with contests.
+RESPONSE_TTL_BY_PATH = {
+    "contest.list": 60,
+    "contest.ratingChanges": 300,
+    "contest.standings": 30,
+    "problemset.problems": 300,
+    "user.info": 60,
+    "user.rating": 300,
+    "user.ratedList": 600,
+    "user.status": 15,
+}
+RESPONSE_CACHE_MAX_SIZE = 64 * 1024 * 1024
+
+response_cache = ResponseCache(RESPONSE_TTL_BY_PATH, RESPONSE_CACHE_MAX_SIZE)
+
+_bypass_cache = contextvars.ContextVar("cf_bypass_cache", default=False)
+
+
+@contextlib.contextmanager
+def uncached():
+    """Queries made under this context manager skip the response cache, for
+    commands that must see the latest data. Their results are still cached.
+    """
+    token = _bypass_cache.set(True)
+    try:
+        yield
+    finally:
+        _bypass_cache.reset(token)
+
+
+def single_flight(f):
+    """Concurrent calls with identical arguments share a single call of `f`
+    and its result, which therefore must not be mutated by callers. A caller
+    being cancelled does not cancel the shared call.
+    """
+    in_flight = {}
+
+    @functools.wraps(f)
+    async def wrapped(path, params=None, *args):
+        key = _query_key(path, params) + args
+        task = in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(f(path, params, *args))
+            in_flight[key] = task
+            task.add_done_callback(lambda _: in_flight.pop(key, None))
+        else:
+            logger.info(f"Joining in-flight query to CF API at {path}")
+        return await asyncio.shield(task)
+
+    return wrapped
+
+
+class _JsonStreamParser:
+    """Decodes a JSON document from an async iterator of byte chunks, so that
+    the elements of a large array can be consumed one at a time as they
+    arrive instead of after the whole document is read and decoded.
+    """
+
+    _WHITESPACE = re.compile(r"[ \t\n\r]*")
+    _NUMBER_CHARS = frozenset("0123456789.eE+-")
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, chunks):
+        self.chunks = chunks.__aiter__()
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.size = 0
+        self.eof = False
+
+    async def stream(self, path, rest):
+        """Yields the elements of the array found by following the keys in
+        `path` from the root object. All other members of the objects along
+        the way are decoded whole and stored in `rest`, in the same shape.
+        """
+        if not path:
+            async for element in self._array():
+                yield element
+            return
+        await self._expect("{")
+        if await self._peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = await self._value()
+            await self._expect(":")
+            if key == path[0] and len(path) > 1:
+                rest[key] = {}
+                async for element in self.stream(path[1:], rest[key]):
+                    yield element
+            elif key == path[0]:
+                async for element in self._array():
+                    yield element
+            else:
+                rest[key] = await self._value()
+            if await self._next() == "}":
+                return
+
+    async def _array(self):
+        await self._expect("[")
+        if await self._peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield await self._value()
+            if await self._next() == "]":
+                return
+
+    async def _value(self):
+        await self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                await self._fill()
+                continue
+            # A number may be cut short by the end of the buffer, leaving
+            # a partial number like "12." which decodes as 12.
+            if (
+                isinstance(value, (int, float))
+                and not self.eof
+                and (
+                    end == len(self.buffer)
+                    or self.buffer[end] in self._NUMBER_CHARS
+                )
+            ):
+                await self._fill()
+                continue
+            self.pos = end
+            return value
+
+    async def _next(self):
+        """Consumes the separator after a member or element, returning it."""
+        char = await self._peek()
+        if char not in ",]}":
+            raise ValueError(f"Unexpected {char!r} in JSON after a value")
+        self.pos += 1
+        return char
+
+    async def _expect(self, char):
+        if await self._peek() != char:
+            raise ValueError(f"Expected {char!r} in JSON")
+        self.pos += 1
+
+    async def _peek(self):
+        while True:
+            self.pos = self._WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            await self._fill()
+
+    async def _fill(self):
+        if self.eof:
+            raise ValueError("Unexpected end of JSON")
+        try:
+            chunk = await self.chunks.__anext__()
+        except StopAsyncIteration:
+            self.eof = True
+            chunk = b""
+        self.size += len(chunk)
+        text = self.utf8.decode(chunk, final=self.eof)
+        self.buffer = self.buffer[self.pos :] + text
+        self.pos = 0
+        # Let other tasks run even if the whole response is already received.
+        await asyncio.sleep(0)
+
+
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+async def _read_json(resp):
+    body = await resp.read()
+    try:
+        if resp.content_type != "application/json":
+            raise ValueError(resp.content_type)
+        return json.loads(body), len(body)
+    except ValueError:
+        logger.warning(
+            f"CF API did not respond with JSON, status {resp.status}."
+        )
+        raise CodeforcesApiError
+
+
+def _api_error(resp, respjson):
+    comment = f'HTTP Error {resp.status}, {respjson.get("comment")}'
+    logger.warning(f"Query to CF API failed: {comment}")
+    if "limit exceeded" in comment:
+        return CallLimitExceededError(comment)
+    return TrueApiError(comment)
+
+
+# Responses at least this large are decoded in a worker process.
+_OFFLOAD_THRESHOLD = 1024 * 1024
+_OFFLOAD_WORKERS = 2
+# Rows of a decoded result are sent back from the worker in pickled chunks of
+# this many, so unpickling them does not block the event loop for long.
+_OFFLOAD_CHUNK_ROWS = 2000
+
+_decode_pool = None
+
+
+def _decode(body, convert):
+    return convert(json.loads(body)["result"])
+
+
+def _decode_pickled(body, convert):
+    """Runs in a worker process. Lists are pickled in chunks of rows."""
+    result = _decode(body, convert)
+    if not isinstance(result, list):
+        return pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+    return [
+        pickle.dumps(chunk, pickle.HIGHEST_PROTOCOL)
+        for chunk in chunkify(result, _OFFLOAD_CHUNK_ROWS)
+    ]
+
+
+async def _decode_offloaded(body, convert):
+    global _decode_pool
+    if _decode_pool is None:
+        _decode_pool = ProcessPoolExecutor(max_workers=_OFFLOAD_WORKERS)
+    pool = _decode_pool
+    loop = asyncio.get_running_loop()
+    try:
+        pickled = await loop.run_in_executor(
+            pool, _decode_pickled, body, convert
+        )
+    except BrokenProcessPool:
+        # A worker died, e.g. killed for memory. The pool cannot be used
+        # again, so it is replaced for later calls and this one is decoded
+        # here.
+        logger.warning("Decoding worker process died, restarting the pool.")
+        if _decode_pool is pool:
+            _decode_pool = None
+            pool.shutdown(wait=False)
+        return _decode(body, convert)
+    if isinstance(pickled, bytes):
+        return pickle.loads(pickled)
+    result = []
+    for chunk in pickled:
+        result += pickle.loads(chunk)
+        await asyncio.sleep(0)
+    return result
+
+
+@single_flight
+@cf_scheduled
+async def _fetch_api(path, params, convert):
+    """Returns the result of the query converted by `convert`, along with the
+    size of the response. Large responses are decoded and converted in a
+    worker process, so `convert` must be picklable.
+    """
     url = API_BASE_URL + path
     try:
         logger.info(f"Querying CF API at {url} with {params}")
         # Explicitly state encoding (though aiohttp accepts gzip by default)
         headers = {"Accept-Encoding": "gzip"}
         async with _session.get(url, params=params, headers=headers) as resp:
+            if resp.status != 200 or resp.content_type != "application/json":
+                respjson, _ = await _read_json(resp)
+                raise _api_error(resp, respjson)
+            body = await resp.read()
+    except aiohttp.ClientError as e:
+        logger.error(f"Request to CF API encountered error: {e!r}")
+        raise ClientError from e
+    try:
+        if len(body) < _OFFLOAD_THRESHOLD:
+            return _decode(body, convert), len(body)
+        return await _decode_offloaded(body, convert), len(body)
+    except ValueError:
+        logger.warning("CF API responded with invalid JSON.")
+        raise CodeforcesApiError
+
+
+@single_flight
+@cf_scheduled
+async def _stream_api(path, params, rows_path, make_row):
+    """Like `_fetch_api`, but the array at `rows_path` in the result is decoded
+    while it is received, each element converted by `make_row`. Returns the
+    rest of the result and the converted rows, along with the size of the
+    response.
+    """
+    url = API_BASE_URL + path
+    try:
+        logger.info(f"Streaming CF API at {url} with {params}")
+        headers = {"Accept-Encoding": "gzip"}
+        async with _session.get(url, params=params, headers=headers) as resp:
+            if resp.status != 200 or resp.content_type != "application/json":
+                respjson, _ = await _read_json(resp)
+                raise _api_error(resp, respjson)
+            parser = _JsonStreamParser(
+                resp.content.iter_chunked(_STREAM_CHUNK_SIZE)
+            )
+            rest = {}
             try:
-                respjson = await resp.json()
-            except aiohttp.ContentTypeError:
-                logger.warning(
-                    f"CF API did not respond with JSON, status {resp.status}."
-                )
+                rows = [
+                    make_row(row)
+                    async for row in parser.stream(
+                        ("result",) + rows_path, rest
+                    )
+                ]
+            except ValueError as e:
+                logger.warning(f"CF API responded with invalid JSON: {e!r}")
                 raise CodeforcesApiError
-            if resp.status == 200:
-                return respjson["result"]
-            comment = f'HTTP Error {resp.status}, {respjson.get("comment")}'
+            return (rest.get("result"), rows), parser.size
     except aiohttp.ClientError as e:
         logger.error(f"Request to CF API encountered error: {e!r}")
         raise ClientError from e
-    logger.warning(f"Query to CF API failed: {comment}")
-    if "limit exceeded" in comment:
-        raise CallLimitExceededError(comment)
-    raise TrueApiError(comment)
+
+
+def _copy_result(result):
+    """Returns a shallow copy of a cached result, so that callers may reorder
+    or extend what they get without affecting the cached one.
+    """
+    if type(result) is tuple:
+        return tuple(map(_copy_result, result))
+    if isinstance(result, (list, dict)):
+        return result.copy()
+    return result
+
+
+async def _cached_query(fetch, path, params, *args):
+    key = _query_key(path, params) + args
+    if not _bypass_cache.get():
+        result = response_cache.get(key)
+        if result is not None:
+            return _copy_result(result)
+    result, size = await fetch(path, params, *args)
+    response_cache.put(key, result, size)
+    return _copy_result(result)
+
+
+async def _query_api(path, params, convert):
+    """Returns the result of the query converted by `convert`, which should
+    build immutable records as the result may be shared with other callers.
+    """
+    return await _cached_query(_fetch_api, path, params, convert)
+
+
+async def _query_api_streamed(path, params, rows_path, make_row):
+    """Returns the result of the query without the array at `rows_path`, and
+    the elements of that array converted by `make_row`. Meant for responses
+    too large to be decoded at once.
+    """
+    return await _cached_query(_stream_api, path, params, rows_path, make_row)
+
+
+async def query_for_handles(query, handles):
+    """Calls the coroutine function `query` with every handle concurrently,
+    still subject to the rate limit. Results are returned in the order of
+    `handles`; if the query for a handle fails, the `CodeforcesApiError` raised
+    takes the place of its result.
+    """
+
+    async def query_one(handle):
+        try:
+            return await query(handle)
+        except CodeforcesApiError as e:
+            return e
+
+    return await asyncio.gather(*(query_one(handle) for handle in handles))
+
+
+def unwrap_results(results):
+    """Raises the first error among results of `query_for_handles`, if any,
+    otherwise returns the results as is.
+    """
+    for result in results:
+        if isinstance(result, CodeforcesApiError):
+            raise result
+    return results
 
 
 class contest:
@@ -331,23 +913,21 @@ class contest:
         params = {}
         if gym is not None:
             params["gym"] = _bool_to_str(gym)
-        resp = await _query_api("contest.list", params)
-        return [make_from_dict(Contest, contest_dict) for contest_dict in resp]
+        return await _query_api("contest.list", params, _make_contests)
 
     @staticmethod
     async def ratingChanges(*, contest_id):
         params = {"contestId": contest_id}
         try:
-            resp = await _query_api("contest.ratingChanges", params)
+            return await _query_api(
+                "contest.ratingChanges", params, _make_rating_changes
+            )
         except TrueApiError as e:
             if "not found" in e.comment:
                 raise ContestNotFoundError(e.comment, contest_id)
             if "Rating changes are unavailable" in e.comment:
                 raise RatingChangesUnavailableError(e.comment, contest_id)
             raise
-        return [
-            make_from_dict(RatingChange, change_dict) for change_dict in resp
-        ]
 
     @staticmethod
     async def standings(
@@ -371,7 +951,9 @@ class contest:
         if show_unofficial is not None:
             params["showUnofficial"] = _bool_to_str(show_unofficial)
         try:
-            resp = await _query_api("contest.standings", params)
+            resp, ranklist = await _query_api_streamed(
+                "contest.standings", params, ("rows",), _make_ranklist_row
+            )
         except TrueApiError as e:
             if "not found" in e.comment:
                 raise ContestNotFoundError(e.comment, contest_id)
@@ -381,19 +963,6 @@ class contest:
             make_from_dict(Problem, problem_dict)
             for problem_dict in resp["problems"]
         ]
-        for row in resp["rows"]:
-            row["party"]["members"] = [
-                make_from_dict(Member, member)
-                for member in row["party"]["members"]
-            ]
-            row["party"] = make_from_dict(Party, row["party"])
-            row["problemResults"] = [
-                make_from_dict(ProblemResult, problem_result)
-                for problem_result in row["problemResults"]
-            ]
-        ranklist = [
-            make_from_dict(RanklistRow, row_dict) for row_dict in resp["rows"]
-        ]
         return contest_, problems, ranklist
 
 
@@ -405,16 +974,9 @@ class problemset:
             params["tags"] = ";".join(tags)
         if problemset_name is not None:
             params["problemsetName"] = problemset_name
-        resp = await _query_api("problemset.problems", params)
-        problems = [
-            make_from_dict(Problem, problem_dict)
-            for problem_dict in resp["problems"]
-        ]
-        problemstats = [
-            make_from_dict(ProblemStatistics, problemstat_dict)
-            for problemstat_dict in resp["problemStatistics"]
-        ]
-        return problems, problemstats
+        return await _query_api(
+            "problemset.problems", params, _make_problemset
+        )
 
 
 class user:
@@ -431,39 +993,44 @@ class user:
         for chunk in chunks:
             params = {"handles": ";".join(chunk)}
             try:
-                resp = await _query_api("user.info", params)
+                result += await _query_api("user.info", params, _make_users)
             except TrueApiError as e:
                 if "not found" in e.comment:
                     # Comment format is "handles: User with handle ***** not found"
                     handle = e.comment.partition("not found")[0].split()[-1]
                     raise HandleNotFoundError(e.comment, handle)
                 raise
-            result += [make_from_dict(User, user_dict) for user_dict in resp]
         return result
 
     @staticmethod
     async def rating(*, handle):
         params = {"handle": handle}
         try:
-            resp = await _query_api("user.rating", params)
+            return await _query_api(
+                "user.rating", params, _make_rating_changes
+            )
         except TrueApiError as e:
             if "not found" in e.comment:
                 raise HandleNotFoundError(e.comment, handle)
             if "should contain" in e.comment:
                 raise HandleInvalidError(e.comment, handle)
             raise
-        return [
-            make_from_dict(RatingChange, ratingchange_dict)
-            for ratingchange_dict in resp
-        ]
+
+    @staticmethod
+    async def rating_for_handles(*, handles):
+        return await query_for_handles(
+            lambda handle: user.rating(handle=handle), handles
+        )
 
     @staticmethod
     async def ratedList(*, activeOnly=None):
         params = {}
         if activeOnly is not None:
             params["activeOnly"] = _bool_to_str(activeOnly)
-        resp = await _query_api("user.ratedList", params=params)
-        return [make_from_dict(User, user_dict) for user_dict in resp]
+        _, users = await _query_api_streamed(
+            "user.ratedList", params, (), _make_user
+        )
+        return users
 
     @staticmethod
     async def status(*, handle, from_=None, count=None):
@@ -473,23 +1040,11 @@ class user:
         if count is not None:
             params["count"] = count
         try:
-            resp = await _query_api("user.status", params)
+            return await _query_api("user.status", params, _make_submissions)
         except TrueApiError as e:
             if "not found" in e.comment:
                 raise HandleNotFoundError(e.comment, handle)
             if "should contain" in e.comment:
                 raise HandleInvalidError(e.comment, handle)
             raise
-        for submission in resp:
-            submission["problem"] = make_from_dict(
-                Problem, submission["problem"]
-            )
-            submission["author"]["members"] = [
-                make_from_dict(Member, member)
-                for member in submission["author"]["members"]
-            ]
-            submission["author"] = make_from_dict(Party, submission["author"])
-        return [
-            make_from_dict(Submission, submission_dict)
-            for submission_dict in resp
-        ]
+
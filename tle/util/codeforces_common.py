@@ -13,6 +13,7 @@ from tle.util import cache_system2
 from tle.util import codeforces_api as cf
 from tle.util import db
 from tle.util import events
+from tle.util import graph_common
 
 logger = logging.getLogger(__name__)
 
@@ -52,7 +53,13 @@ async def initialize(nodb):
         user_db = db.UserDbConn(constants.USER_DB_FILE_PATH)
 
     cache_db = db.CacheDbConn(constants.CACHE_DB_FILE_PATH)
-    cache2 = cache_system2.CacheSystem(cache_db)
+    cache2 = cache_system2.CacheSystem(
+        cache_db, constants.CACHE_SNAPSHOT_FILE_PATH
+    )
+    # Rendered images are made from cached data and are dropped when it
+    # changes, whichever cog rendered them.
+    event_sys.add_listener(graph_common.on_contest_list_refresh)
+    event_sys.add_listener(graph_common.on_rating_changes_update)
     await cache2.run()
 
     try:
@@ -235,16 +242,28 @@ async def resolve_handles(ctx, converter, handles, *, mincnt=1, maxcnt=5):
     otherwise it is a raw CF handle to be left unchanged."""
     if len(handles) < mincnt or (maxcnt and maxcnt < len(handles)):
         raise HandleCountOutOfBoundsError(mincnt, maxcnt)
+    handles = list(handles)
+    # ! denotes Discord user. Members are looked up first, and then their
+    # handles all at once.
+    members = {}
+    for handle in handles:
+        member_identifier = handle[1:]
+        if not handle.startswith("!") or member_identifier in members:
+            continue
+        try:
+            members[member_identifier] = await converter.convert(
+                ctx, member_identifier
+            )
+        except commands.errors.CommandError:
+            raise FindMemberFailedError(member_identifier)
+    member_handles = user_db.get_handles(
+        [member.id for member in members.values()], ctx.guild.id
+    )
     resolved_handles = []
     for handle in handles:
         if handle.startswith("!"):
-            # ! denotes Discord user
-            member_identifier = handle[1:]
-            try:
-                member = await converter.convert(ctx, member_identifier)
-            except commands.errors.CommandError:
-                raise FindMemberFailedError(member_identifier)
-            handle = user_db.get_handle(member.id, ctx.guild.id)
+            member = members[handle[1:]]
+            handle = member_handles.get(member.id)
             if handle is None:
                 raise HandleNotRegisteredError(member)
         if handle in HandleIsVjudgeError.HANDLES:
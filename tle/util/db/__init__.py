@@ -1,2 +1,3 @@
+from .db_conn import *
 from .cache_db_conn import *
 from .user_db_conn import *
@@ -1,12 +1,12 @@
 import json
-import sqlite3
 
 from tle.util import codeforces_api as cf
+from tle.util.db.db_conn import DbConn
 
 
-class CacheDbConn:
+class CacheDbConn(DbConn):
     def __init__(self, db_file):
-        self.conn = sqlite3.connect(db_file)
+        super().__init__(db_file)
         self.create_tables()
 
     def create_tables(self):
@@ -60,6 +60,18 @@ class CacheDbConn:
             "ON rating_change (handle)"
         )
 
+        # Table for the current rating of every handle, kept up to date with the
+        # rating changes so they need not be summed up on startup.
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS handle_rating ("
+            "handle               TEXT NOT NULL,"
+            "rating               INTEGER,"
+            "contest_count        INTEGER,"
+            "last_update          INTEGER,"
+            "PRIMARY KEY (handle)"
+            ")"
+        )
+
         # Table for problems fetched from contest.standings endpoint for every contest.
         # This is separate from table problem as it contains the same problem twice if it
         # appeared in both Div 1 and Div 2 of some round.
@@ -81,6 +93,68 @@ class CacheDbConn:
             "ON problem2 (contest_id)"
         )
 
+        # Table for submissions fetched from the user.status endpoint for every handle queried.
+        # The problem is stored flattened like in table problem, and the author as JSON.
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS submission ("
+            "handle               TEXT NOT NULL,"
+            "id                   INTEGER NOT NULL,"
+            "contest_id           INTEGER,"
+            "problem_contest_id   INTEGER,"
+            "problemset_name      TEXT,"
+            "[index]              TEXT,"
+            "problem_name         TEXT,"
+            "problem_type         TEXT,"
+            "points               REAL,"
+            "rating               INTEGER,"
+            "tags                 TEXT,"
+            "author               TEXT,"
+            "programming_language TEXT,"
+            "verdict              TEXT,"
+            "creation_time        INTEGER,"
+            "PRIMARY KEY (handle, id)"
+            ")"
+        )
+
+        # Tables for the individual participants of finished contests, from the
+        # contest.standings and contest.ratingChanges endpoints, with their
+        # rating change if they had one. Contests whose participants are saved
+        # are listed in participation_saved, as a contest may have none.
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS contest_participant ("
+            "contest_id           INTEGER NOT NULL,"
+            "handle               TEXT NOT NULL,"
+            "old_rating           INTEGER,"
+            "new_rating           INTEGER,"
+            "PRIMARY KEY (contest_id, handle)"
+            ")"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS participation_saved ("
+            "contest_id           INTEGER NOT NULL,"
+            "PRIMARY KEY (contest_id)"
+            ")"
+        )
+
+        # Table with a single row counting writes to the tables above, except
+        # for submissions and participants. A snapshot of the cache is up to
+        # date only if it was taken at the current generation.
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS generation (value INTEGER NOT NULL)"
+        )
+        query = "SELECT value FROM generation"
+        if self.conn.execute(query).fetchone() is None:
+            self.conn.execute("INSERT INTO generation (value) VALUES (0)")
+            self.conn.commit()
+
+    def get_generation(self):
+        query = "SELECT value FROM generation"
+        return self.conn.execute(query).fetchone()[0]
+
+    def _commit_with_new_generation(self):
+        self.conn.execute("UPDATE generation SET value = value + 1")
+        self.conn.commit()
+
     def cache_contests(self, contests):
         query = (
             "INSERT OR REPLACE INTO contest "
@@ -88,7 +162,7 @@ class CacheDbConn:
             "VALUES (?, ?, ?, ?, ?, ?, ?)"
         )
         rc = self.conn.executemany(query, contests).rowcount
-        self.conn.commit()
+        self._commit_with_new_generation()
         return rc
 
     def fetch_contests(self):
@@ -121,7 +195,7 @@ class CacheDbConn:
         rc = self.conn.executemany(
             query, list(map(self._squish_tags, problems))
         ).rowcount
-        self.conn.commit()
+        self._commit_with_new_generation()
         return rc
 
     @staticmethod
@@ -155,7 +229,7 @@ class CacheDbConn:
             "VALUES (?, ?, ?, ?, ?, ?)"
         )
         rc = self.conn.executemany(query, change_tuples).rowcount
-        self.conn.commit()
+        self._commit_with_new_generation()
         return rc
 
     def clear_rating_changes(self, contest_id=None):
@@ -165,22 +239,40 @@ class CacheDbConn:
         else:
             query = "DELETE FROM rating_change WHERE contest_id = ?"
             self.conn.execute(query, (contest_id,))
-        self.conn.commit()
+        self._commit_with_new_generation()
+
+    def get_rating_change_count(self):
+        query = "SELECT COUNT(*) FROM rating_change"
+        return self.conn.execute(query).fetchone()[0]
 
-    def get_users_with_more_than_n_contests(self, time_cutoff, n):
+    def get_handle_ratings(self):
         query = (
-            "SELECT handle, COUNT(*) AS num_contests "
-            "FROM rating_change GROUP BY handle HAVING num_contests >= ? "
-            "AND MAX(rating_update_time) >= ?"
+            "SELECT handle, rating, contest_count, last_update "
+            "FROM handle_rating"
         )
-        res = self.conn.execute(
-            query,
-            (
-                n,
-                time_cutoff,
-            ),
-        ).fetchall()
-        return [user[0] for user in res]
+        return self.conn.execute(query).fetchall()
+
+    def save_handle_ratings(self, handle_ratings):
+        query = (
+            "INSERT OR REPLACE INTO handle_rating "
+            "(handle, rating, contest_count, last_update) "
+            "VALUES (?, ?, ?, ?)"
+        )
+        rc = self.conn.executemany(query, handle_ratings).rowcount
+        self._commit_with_new_generation()
+        return rc
+
+    def rebuild_handle_ratings(self, initial_rating):
+        self.conn.execute("DELETE FROM handle_rating")
+        query = (
+            "INSERT INTO handle_rating (handle, rating, contest_count, last_update) "
+            "SELECT handle, ? + SUM(new_rating - old_rating), COUNT(*), "
+            "MAX(rating_update_time) "
+            "FROM rating_change GROUP BY handle"
+        )
+        rc = self.conn.execute(query, (initial_rating,)).rowcount
+        self._commit_with_new_generation()
+        return rc
 
     def get_all_rating_changes(self):
         query = (
@@ -210,6 +302,14 @@ class CacheDbConn:
         res = self.conn.execute(query, (contest_id,)).fetchone()
         return res is not None
 
+    def get_contest_ids_with_rating_changes(self):
+        # One index lookup per contest, rather than a scan of all changes.
+        query = (
+            "SELECT id FROM contest c "
+            "WHERE EXISTS (SELECT 1 FROM rating_change WHERE contest_id = c.id)"
+        )
+        return {contest_id for contest_id, in self.conn.execute(query)}
+
     def get_rating_changes_for_handle(self, handle):
         query = (
             "SELECT contest_id, name, handle, rank, rating_update_time, old_rating, new_rating "
@@ -230,7 +330,7 @@ class CacheDbConn:
         rc = self.conn.executemany(
             query, list(map(self._squish_tags, problemset))
         ).rowcount
-        self.conn.commit()
+        self._commit_with_new_generation()
         return rc
 
     def fetch_problems2(self):
@@ -258,10 +358,145 @@ class CacheDbConn:
         res = self.conn.execute(query, (contest_id,)).fetchall()
         return list(map(self._unsquish_tags, res))
 
+    def get_problemset_summaries(self):
+        """Returns, for every contest with a saved problemset, the number of
+        problems and the set of indices of the rated ones.
+        """
+        query = (
+            "SELECT contest_id, COUNT(*), "
+            "    GROUP_CONCAT(CASE WHEN rating IS NOT NULL THEN [index] END) "
+            "FROM problem2 "
+            "GROUP BY contest_id"
+        )
+        return {
+            contest_id: (count, set(rated.split(",")) if rated else set())
+            for contest_id, count, rated in self.conn.execute(query)
+        }
+
     def problemset_empty(self):
         query = "SELECT 1 FROM problem2"
         res = self.conn.execute(query).fetchone()
         return res is None
 
-    def close(self):
-        self.conn.close()
+    @classmethod
+    def _squish_submission(cls, handle, submission):
+        author = submission.author._asdict()
+        author["members"] = [
+            member.handle for member in submission.author.members
+        ]
+        return (
+            handle,
+            submission.id,
+            submission.contestId,
+            *cls._squish_tags(submission.problem),
+            json.dumps(author),
+            submission.programmingLanguage,
+            submission.verdict,
+            submission.creationTimeSeconds,
+        )
+
+    @classmethod
+    def _unsquish_submission(cls, submission):
+        id_, contest_id = submission[:2]
+        problem = cls._unsquish_tags(submission[2:10])
+        author = json.loads(submission[10])
+        author["members"] = [cf.Member(handle) for handle in author["members"]]
+        return cf.Submission(
+            id_, contest_id, problem, cf.Party(**author), *submission[11:]
+        )
+
+    def cache_submissions(self, handle, submissions):
+        query = (
+            "INSERT OR REPLACE INTO submission "
+            "(handle, id, contest_id, problem_contest_id, problemset_name, [index], "
+            "problem_name, problem_type, points, rating, tags, author, "
+            "programming_language, verdict, creation_time) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+        )
+        rc = self.conn.executemany(
+            query,
+            [self._squish_submission(handle, sub) for sub in submissions],
+        ).rowcount
+        self.conn.commit()
+        return rc
+
+    def fetch_submissions(self, handle):
+        query = (
+            "SELECT id, contest_id, problem_contest_id, problemset_name, [index], "
+            "problem_name, problem_type, points, rating, tags, author, "
+            "programming_language, verdict, creation_time "
+            "FROM submission "
+            "WHERE handle = ? "
+            "ORDER BY id DESC"
+        )
+        res = self.conn.execute(query, (handle,)).fetchall()
+        return list(map(self._unsquish_submission, res))
+
+    def clear_submissions(self, handle=None):
+        if handle is None:
+            query = "DELETE FROM submission"
+            rc = self.conn.execute(query).rowcount
+        else:
+            query = "DELETE FROM submission WHERE handle = ?"
+            rc = self.conn.execute(query, (handle,)).rowcount
+        self.conn.commit()
+        return rc
+
+    def save_contest_participants(self, contest_participants):
+        """Saves, for each pair of contest id and list of (handle, old
+        rating, new rating), the participants of the contest in place of any
+        saved before. Commits once for all contests.
+        """
+        with self.transaction():
+            for contest_id, participants in contest_participants:
+                self.clear_contest_participants(contest_id)
+                query = (
+                    "INSERT INTO contest_participant "
+                    "(contest_id, handle, old_rating, new_rating) "
+                    "VALUES (?, ?, ?, ?)"
+                )
+                self.conn.executemany(
+                    query,
+                    [
+                        (contest_id, *participant)
+                        for participant in participants
+                    ],
+                )
+                query = (
+                    "INSERT INTO participation_saved (contest_id) VALUES (?)"
+                )
+                self.conn.execute(query, (contest_id,))
+
+    def get_contest_ids_with_participants(self):
+        query = "SELECT contest_id FROM participation_saved"
+        return {contest_id for contest_id, in self.conn.execute(query)}
+
+    def get_contest_participants(self, contest_id, handles):
+        """Returns (handle, old rating, new rating) for each of the handles
+        which took part in the contest."""
+        handles = list(handles)
+        res = []
+        # Older versions of SQLite allow at most 999 parameters.
+        for i in range(0, len(handles), 500):
+            chunk = handles[i : i + 500]
+            query = (
+                "SELECT handle, old_rating, new_rating "
+                "FROM contest_participant "
+                "WHERE contest_id = ? AND handle IN ({})".format(
+                    ", ".join(["?"] * len(chunk))
+                )
+            )
+            res += self.conn.execute(query, (contest_id, *chunk)).fetchall()
+        return res
+
+    def clear_contest_participants(self, contest_id=None):
+        if contest_id is None:
+            self.conn.execute("DELETE FROM contest_participant")
+            rc = self.conn.execute("DELETE FROM participation_saved").rowcount
+        else:
+            query = "DELETE FROM contest_participant WHERE contest_id = ?"
+            self.conn.execute(query, (contest_id,))
+            query = "DELETE FROM participation_saved WHERE contest_id = ?"
+            rc = self.conn.execute(query, (contest_id,)).rowcount
+        self.conn.commit()
+        return rc
@@ -0,0 +1,193 @@
+"""Base of the database connections.
+
+Every public method of a connection is timed, and the time spent is kept per
+method for `query_stats`. Coroutines must not call slow methods directly, as
+they block the event loop: `conn.aio` mirrors the methods of `conn` as
+awaitables which run in a thread of their own, on a connection of their own
+to the same database. Databases are in WAL mode, so that readers on either
+connection never wait for the writer. Writes on `conn` do wait for a write in
+progress on `conn.aio`, so once a database is written through `conn.aio` all
+its writes should be. `conn.aio` is a second instance of the connection class,
+so classes that keep data in memory besides the database cannot have one.
+
+Methods commit their own writes. Writes that come in bulk should be made in
+a `transaction`, so that they are committed, and synced to disk, once.
+"""
+
+import asyncio
+import contextlib
+import inspect
+import functools
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# Seconds a write waits for a write on the other connection to finish.
+_BUSY_TIMEOUT = 60
+
+QueryStats = namedtuple("QueryStats", "calls mean_time max_time total_time")
+
+_stats_lock = threading.Lock()
+# "Class.method" -> [calls, total time, max time]
+_stats = {}
+
+
+def _record(name, elapsed):
+    with _stats_lock:
+        stats = _stats.setdefault(name, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] = max(stats[2], elapsed)
+
+
+def query_stats():
+    """Returns the `QueryStats` of every method called so far, by name."""
+    with _stats_lock:
+        return {
+            name: QueryStats(calls, total / calls, max_time, total)
+            for name, (calls, total, max_time) in _stats.items()
+        }
+
+
+def _timed(name, method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        begin = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            _record(name, time.perf_counter() - begin)
+
+    return wrapper
+
+
+class _Connection(sqlite3.Connection):
+    """Connection which defers commits while a transaction is open, and
+    times the commits it makes."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.in_transaction_block = False
+        self.commit_stats_name = "commit"
+
+    def commit(self):
+        if self.in_transaction_block:
+            return
+        begin = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            _record(self.commit_stats_name, time.perf_counter() - begin)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # The builtin commits without going through `commit`.
+        if exc_type is None:
+            self.commit()
+        elif not self.in_transaction_block:
+            self.rollback()
+        return False
+
+
+def connect(db_file, name="Connection"):
+    conn = sqlite3.connect(db_file, timeout=_BUSY_TIMEOUT, factory=_Connection)
+    conn.commit_stats_name = f"{name}.commit"
+    conn.execute("PRAGMA journal_mode = WAL")
+    # Safe in WAL mode, a crash can only lose the latest transactions.
+    conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+
+class DbConn:
+    # Set by subclasses that keep data in memory, which the instance made by
+    # `aio` would not share.
+    _has_memory_state = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name, attr in list(vars(cls).items()):
+            if inspect.isfunction(attr) and not name.startswith("_"):
+                setattr(cls, name, _timed(f"{cls.__name__}.{name}", attr))
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.conn = connect(db_file, type(self).__name__)
+        self._aio = None
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Unit of work: the writes of the methods called inside are
+        committed together on exit, or all rolled back if it raises. A
+        transaction inside another is part of the outer one. A method that
+        rolls back its own write rolls back the whole transaction.
+        """
+        if self.conn.in_transaction_block:
+            yield
+            return
+        self.conn.in_transaction_block = True
+        try:
+            yield
+        except BaseException:
+            self.conn.in_transaction_block = False
+            self.conn.rollback()
+            raise
+        self.conn.in_transaction_block = False
+        self.conn.commit()
+
+    @property
+    def aio(self):
+        if self._has_memory_state:
+            raise TypeError(
+                f"{type(self).__name__} keeps data in memory and has no aio"
+            )
+        if self._aio is None:
+            self._aio = AsyncDbConn(type(self), self.db_file)
+        return self._aio
+
+    def close(self):
+        if self._aio is not None:
+            self._aio.close()
+        self.conn.close()
+
+
+class AsyncDbConn:
+    """Runs the methods of a connection class in a dedicated thread. The
+    connection is opened in that thread, as sqlite3 connections may only be
+    used by the thread that created them. Calls run one at a time, in order.
+    """
+
+    def __init__(self, conn_cls, db_file):
+        self._conn_cls = conn_cls
+        self._db_file = db_file
+        self._conn = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=conn_cls.__name__
+        )
+
+    def _call(self, name, args, kwargs):
+        if self._conn is None:
+            self._conn = self._conn_cls(self._db_file)
+        return getattr(self._conn, name)(*args, **kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith("_") or not callable(
+            getattr(self._conn_cls, name, None)
+        ):
+            raise AttributeError(name)
+
+        async def call(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, self._call, name, args, kwargs
+            )
+
+        return call
+
+    def close(self):
+        def close_conn():
+            if self._conn is not None:
+                self._conn.close()
+
+        self._executor.submit(close_conn)
+        self._executor.shutdown(wait=True)
@@ -1,10 +1,10 @@
-import sqlite3
 import time
 from enum import IntEnum
 
 from discord.ext import commands
 
 from tle.util import codeforces_api as cf
+from tle.util.db.db_conn import DbConn
 
 
 class Gitgud(IntEnum):
@@ -57,10 +57,41 @@ class UniqueConstraintFailed(UserDbError):
     pass
 
 
-class UserDbConn:
+class UserDbConn(DbConn):
+    _has_memory_state = True
+
     def __init__(self, dbfile):
-        self.conn = sqlite3.connect(dbfile)
+        super().__init__(dbfile)
         self.create_tables()
+        self._load_guild_settings()
+        # str(guild_id) -> user id -> (handle, active), see `_guild_handles`
+        self._handles = {}
+
+    def _load_guild_settings(self):
+        """Guild settings are read on every event of some kinds, so they are
+        all kept in memory, keyed by guild id as a string. Their setters write
+        through to the database. Another connection to the same database does
+        not see these writes in its cache.
+        """
+        query = "SELECT guild_id, channel_id, role_id, before FROM reminder"
+        self._reminder_settings = {
+            guild_id: tuple(settings)
+            for guild_id, *settings in self.conn.execute(query)
+        }
+        query = "SELECT guild_id, channel_id FROM starboard"
+        self._starboard = {
+            guild_id: (channel_id,)
+            for guild_id, channel_id in self.conn.execute(query)
+        }
+        query = "SELECT guild_id, channel_id FROM rankup"
+        self._rankup_channel = {
+            guild_id: int(channel_id)
+            for guild_id, channel_id in self.conn.execute(query)
+        }
+        query = "SELECT guild_id FROM auto_role_update"
+        self._auto_role_update = {
+            guild_id for guild_id, in self.conn.execute(query)
+        }
 
     def create_tables(self):
         self.conn.execute(
@@ -118,6 +149,16 @@ class UserDbConn:
             )
         """
         )
+        # Rating of each duelist after each of their completed duels.
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS duel_rating_history(
+                "user_id"	INTEGER NOT NULL,
+                "duel_id"	INTEGER NOT NULL,
+                "finish_time"	REAL,
+                "rating"	INTEGER NOT NULL,
+                PRIMARY KEY (user_id, duel_id)
+            )
+        """)
         self.conn.execute(
             """
             CREATE TABLE IF NOT EXISTS "challenge" (
@@ -383,6 +424,16 @@ class UserDbConn:
         with self.conn:
             return self.conn.execute(query, user).rowcount
 
+    def cache_cf_users(self, users):
+        query = (
+            "INSERT OR REPLACE INTO cf_user_cache "
+            "(handle, first_name, last_name, country, city, organization, contribution, "
+            "    rating, last_online_time, registration_time, friend_of_count, title_photo) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+        )
+        with self.conn:
+            return self.conn.executemany(query, users).rowcount
+
     def fetch_cf_user(self, handle):
         query = (
             "SELECT handle, first_name, last_name, country, city, organization, contribution, "
@@ -393,6 +444,30 @@ class UserDbConn:
         user = self.conn.execute(query, (handle,)).fetchone()
         return cf.User._make(user) if user else None
 
+    def _guild_handles(self, guild_id):
+        """Handles are looked up on most commands, often for every member,
+        so those of a guild are loaded into memory on first use, as a dict of
+        user id as a string to (handle, active). The methods which change
+        handles update it; `update_status` changes every guild, so it drops
+        all of them.
+        """
+        guild_id = str(guild_id)
+        handles = self._handles.get(guild_id)
+        if handles is None:
+            query = (
+                "SELECT user_id, handle, active "
+                "FROM user_handle "
+                "WHERE guild_id = ?"
+            )
+            handles = {
+                user_id: (handle, bool(active))
+                for user_id, handle, active in self.conn.execute(
+                    query, (guild_id,)
+                )
+            }
+            self._handles[guild_id] = handles
+        return handles
+
     def set_handle(self, user_id, guild_id, handle):
         query = (
             "SELECT user_id "
@@ -409,27 +484,41 @@ class UserDbConn:
             "VALUES (?, ?, ?, 1)"
         )
         with self.conn:
-            return self.conn.execute(
-                query, (user_id, guild_id, handle)
-            ).rowcount
+            rc = self.conn.execute(query, (user_id, guild_id, handle)).rowcount
+        handles = self._guild_handles(guild_id)
+        # The replaced row goes last, as in the table.
+        handles.pop(str(user_id), None)
+        handles[str(user_id)] = handle, True
+        return rc
 
     def set_inactive(self, guild_id_user_id_pairs):
+        guild_id_user_id_pairs = list(guild_id_user_id_pairs)
         query = (
             "UPDATE user_handle "
             "SET active = 0 "
             "WHERE guild_id = ? AND user_id = ?"
         )
         with self.conn:
-            return self.conn.executemany(query, guild_id_user_id_pairs).rowcount
+            rc = self.conn.executemany(query, guild_id_user_id_pairs).rowcount
+        for guild_id, user_id in guild_id_user_id_pairs:
+            handles = self._handles.get(str(guild_id), {})
+            if str(user_id) in handles:
+                handles[str(user_id)] = handles[str(user_id)][0], False
+        return rc
 
     def get_handle(self, user_id, guild_id):
-        query = (
-            "SELECT handle "
-            "FROM user_handle "
-            "WHERE user_id = ? AND guild_id = ?"
-        )
-        res = self.conn.execute(query, (user_id, guild_id)).fetchone()
-        return res[0] if res else None
+        entry = self._guild_handles(guild_id).get(str(user_id))
+        return entry[0] if entry else None
+
+    def get_handles(self, user_ids, guild_id):
+        """Returns a dict of the given user ids to their handles, leaving out
+        users without one. Like `get_handle`, includes inactive users."""
+        handles = self._guild_handles(guild_id)
+        return {
+            user_id: handles[str(user_id)][0]
+            for user_id in user_ids
+            if str(user_id) in handles
+        }
 
     def get_user_id(self, handle, guild_id):
         query = (
@@ -443,16 +532,18 @@ class UserDbConn:
     def remove_handle(self, user_id, guild_id):
         query = "DELETE FROM user_handle " "WHERE user_id = ? AND guild_id = ?"
         with self.conn:
-            return self.conn.execute(query, (user_id, guild_id)).rowcount
+            rc = self.conn.execute(query, (user_id, guild_id)).rowcount
+        self._handles.get(str(guild_id), {}).pop(str(user_id), None)
+        return rc
 
     def get_handles_for_guild(self, guild_id):
-        query = (
-            "SELECT user_id, handle "
-            "FROM user_handle "
-            "WHERE guild_id = ? AND active = 1"
-        )
-        res = self.conn.execute(query, (guild_id,)).fetchall()
-        return [(int(user_id), handle) for user_id, handle in res]
+        return [
+            (int(user_id), handle)
+            for user_id, (handle, active) in self._guild_handles(
+                guild_id
+            ).items()
+            if active
+        ]
 
     def get_cf_users_for_guild(self, guild_id):
         query = (
@@ -468,12 +559,7 @@ class UserDbConn:
         return [(int(t[0]), cf.User._make(t[1:])) for t in res]
 
     def get_reminder_settings(self, guild_id):
-        query = """
-            SELECT channel_id, role_id, before
-            FROM reminder
-            WHERE guild_id = ?
-        """
-        return self.conn.execute(query, (guild_id,)).fetchone()
+        return self._reminder_settings.get(str(guild_id))
 
     def set_reminder_settings(self, guild_id, channel_id, role_id, before):
         query = """
@@ -482,15 +568,20 @@ class UserDbConn:
         """
         self.conn.execute(query, (guild_id, channel_id, role_id, before))
         self.conn.commit()
+        self._reminder_settings[str(guild_id)] = (
+            str(channel_id),
+            str(role_id),
+            before,
+        )
 
     def clear_reminder_settings(self, guild_id):
         query = """DELETE FROM reminder WHERE guild_id = ?"""
         self.conn.execute(query, (guild_id,))
         self.conn.commit()
+        self._reminder_settings.pop(str(guild_id), None)
 
     def get_starboard(self, guild_id):
-        query = "SELECT channel_id " "FROM starboard " "WHERE guild_id = ?"
-        return self.conn.execute(query, (guild_id,)).fetchone()
+        return self._starboard.get(str(guild_id))
 
     def set_starboard(self, guild_id, channel_id):
         query = (
@@ -500,11 +591,13 @@ class UserDbConn:
         )
         self.conn.execute(query, (guild_id, channel_id))
         self.conn.commit()
+        self._starboard[str(guild_id)] = (str(channel_id),)
 
     def clear_starboard(self, guild_id):
         query = "DELETE FROM starboard " "WHERE guild_id = ?"
         self.conn.execute(query, (guild_id,))
         self.conn.commit()
+        self._starboard.pop(str(guild_id), None)
 
     def add_starboard_message(
         self, original_msg_id, starboard_msg_id, guild_id
@@ -660,18 +753,29 @@ class UserDbConn:
         query = f"""
             UPDATE duel SET status = {Duel.COMPLETE}, finish_time = ?, winner = ? WHERE id = ? AND status = {Duel.ONGOING}
         """
-        rc = self.conn.execute(query, (finish_time, winner, duelid)).rowcount
-        if rc != 1:
-            self.conn.rollback()
-            return 0
-
-        if dtype == DuelType.OFFICIAL:
-            self.update_duel_rating(winner_id, +delta)
-            self.update_duel_rating(loser_id, -delta)
-
-        self.conn.commit()
+        with self.transaction():
+            rc = self.conn.execute(
+                query, (finish_time, winner, duelid)
+            ).rowcount
+            if rc != 1:
+                return 0
+
+            if dtype == DuelType.OFFICIAL:
+                self.update_duel_rating(winner_id, +delta)
+                self.update_duel_rating(loser_id, -delta)
+            self._add_duel_rating_history(
+                duelid, finish_time, winner_id, loser_id
+            )
         return 1
 
+    def _add_duel_rating_history(self, duelid, finish_time, *userids):
+        query = """
+            INSERT OR REPLACE INTO duel_rating_history
+            (user_id, duel_id, finish_time, rating)
+            SELECT user_id, ?, ?, rating FROM duelist WHERE user_id IN (?, ?)
+        """
+        self.conn.execute(query, (duelid, finish_time, *userids))
+
     def update_duel_rating(self, userid, delta):
         query = """
             UPDATE duelist SET rating = rating + ? WHERE user_id = ?
@@ -785,6 +889,91 @@ class UserDbConn:
         """
         return self.conn.execute(query).fetchall()
 
+    def is_duel_rating_history_complete(self):
+        query = f"""
+            SELECT
+                (SELECT COUNT(*) FROM duel WHERE status = {Duel.COMPLETE}),
+                (SELECT COUNT(DISTINCT duel_id) FROM duel_rating_history)
+        """
+        num_complete, num_in_history = self.conn.execute(query).fetchone()
+        return num_complete == num_in_history
+
+    def rebuild_duel_rating_history(self, rating_delta):
+        """Rebuilds the duel rating history by replaying all completed duels.
+        `rating_delta(challenger_rating, challengee_rating, score)` gives the
+        rating change of the challenger in an official duel, where `score` is
+        1 for a win, 0.5 for a draw and 0 for a loss.
+        """
+        query = f"""
+            SELECT id, challenger, challengee, winner, finish_time, type
+            FROM duel WHERE status = {Duel.COMPLETE}
+            ORDER BY finish_time ASC
+        """
+        score_by_winner = {
+            Winner.CHALLENGER: 1,
+            Winner.CHALLENGEE: 0,
+            Winner.DRAW: 0.5,
+        }
+        rating = {}
+        history = []
+        duels = self.conn.execute(query).fetchall()
+        for (
+            duelid,
+            challenger,
+            challengee,
+            winner,
+            finish_time,
+            dtype,
+        ) in duels:
+            challenger_r = rating.get(challenger, 1500)
+            challengee_r = rating.get(challengee, 1500)
+            if dtype != DuelType.UNOFFICIAL:
+                delta = rating_delta(
+                    challenger_r, challengee_r, score_by_winner[winner]
+                )
+                challenger_r += delta
+                challengee_r -= delta
+            rating[challenger] = challenger_r
+            rating[challengee] = challengee_r
+            history.append((challenger, duelid, finish_time, challenger_r))
+            history.append((challengee, duelid, finish_time, challengee_r))
+        query = """
+            INSERT INTO duel_rating_history
+            (user_id, duel_id, finish_time, rating)
+            VALUES (?, ?, ?, ?)
+        """
+        with self.transaction():
+            self.conn.execute("DELETE FROM duel_rating_history")
+            self.conn.executemany(query, history)
+        return len(history)
+
+    def get_duel_rating_history(self, userids):
+        """Returns (duel id, user id, rating) after every completed duel of
+        the given duelists, in the order the duels were completed."""
+        placeholders = ", ".join(["?"] * len(userids))
+        query = f"""
+            SELECT duel_id, user_id, rating FROM duel_rating_history
+            WHERE user_id IN ({placeholders})
+            ORDER BY finish_time ASC, duel_id ASC
+        """
+        return self.conn.execute(query, userids).fetchall()
+
+    def get_duel_ranklist(self, guild_id):
+        """Returns (user id, handle, rating) of the duelists with a completed
+        duel, highest rating first. The handle is the one set in the guild, or
+        None."""
+        query = """
+            SELECT d.user_id, u.handle, d.rating FROM duelist AS d
+            LEFT JOIN user_handle AS u
+            ON u.user_id = d.user_id AND u.guild_id = ?
+            WHERE EXISTS (
+                SELECT 1 FROM duel_rating_history AS h
+                WHERE h.user_id = d.user_id
+            )
+            ORDER BY d.rating DESC
+        """
+        return self.conn.execute(query, (guild_id,)).fetchall()
+
     # Tournament database functions start
 
     def register_contestant(self, userid):
@@ -1023,9 +1212,7 @@ class UserDbConn:
     # Tournament database functions end
 
     def get_rankup_channel(self, guild_id):
-        query = "SELECT channel_id " "FROM rankup " "WHERE guild_id = ?"
-        channel_id = self.conn.execute(query, (guild_id,)).fetchone()
-        return int(channel_id[0]) if channel_id else None
+        return self._rankup_channel.get(str(guild_id))
 
     def set_rankup_channel(self, guild_id, channel_id):
         query = (
@@ -1035,11 +1222,14 @@ class UserDbConn:
         )
         with self.conn:
             self.conn.execute(query, (guild_id, channel_id))
+        self._rankup_channel[str(guild_id)] = int(channel_id)
 
     def clear_rankup_channel(self, guild_id):
         query = "DELETE FROM rankup " "WHERE guild_id = ?"
         with self.conn:
-            return self.conn.execute(query, (guild_id,)).rowcount
+            rc = self.conn.execute(query, (guild_id,)).rowcount
+        self._rankup_channel.pop(str(guild_id), None)
+        return rc
 
     def enable_auto_role_update(self, guild_id):
         query = (
@@ -1048,16 +1238,19 @@ class UserDbConn:
             "VALUES (?)"
         )
         with self.conn:
-            return self.conn.execute(query, (guild_id,)).rowcount
+            rc = self.conn.execute(query, (guild_id,)).rowcount
+        self._auto_role_update.add(str(guild_id))
+        return rc
 
     def disable_auto_role_update(self, guild_id):
         query = "DELETE FROM auto_role_update " "WHERE guild_id = ?"
         with self.conn:
-            return self.conn.execute(query, (guild_id,)).rowcount
+            rc = self.conn.execute(query, (guild_id,)).rowcount
+        self._auto_role_update.discard(str(guild_id))
+        return rc
 
     def has_auto_role_update_enabled(self, guild_id):
-        query = "SELECT 1 " "FROM auto_role_update " "WHERE guild_id = ?"
-        return self.conn.execute(query, (guild_id,)).fetchone() is not None
+        return str(guild_id) in self._auto_role_update
 
     def update_status(self, active_ids: list):
         # TODO: Deal with the whole status thing.
@@ -1081,7 +1274,5 @@ class UserDbConn:
         self.conn.execute(inactive_query, active_ids)
         rc = self.conn.execute(active_query, active_ids).rowcount
         self.conn.commit()
+        self._handles.clear()
         return rc
-
-    def close(self):
-        self.conn.close()
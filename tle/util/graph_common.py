@@ -1,16 +1,65 @@
-import os
+import asyncio
+import bisect
 import io
-import discord
+import threading
 import time
-import matplotlib.font_manager
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import discord
 
 from tle import constants
-from matplotlib import pyplot as plt
-from matplotlib import rcParams
+from tle.util import codeforces_api as cf
+from tle.util import events
+from tle.util import lazy
+
+mpl = lazy.import_module("matplotlib")
+font_manager = lazy.import_module("matplotlib.font_manager")
+mpl_figure = lazy.import_module("matplotlib.figure")
+pd = lazy.import_module("pandas")
+sns = lazy.import_module("seaborn")
+
+# Set by configure_plotting.
+fontprop = None
+
+_configure_lock = threading.Lock()
+_configured = False
+_warm_up_future = None
 
-fontprop = matplotlib.font_manager.FontProperties(
-    fname=constants.NOTO_SANS_CJK_REGULAR_FONT_PATH
-)
+
+def configure_plotting():
+    """Imports the plotting libraries and sets the style of plots, once. This
+    runs in every render worker, and ahead of time in the bot by `warm_up`.
+    """
+    global fontprop, _configured
+    with _configure_lock:
+        if _configured:
+            return
+        mpl.rcParams["figure.figsize"] = 7.0, 3.5
+        sns.set()
+        options = {
+            "axes.edgecolor": "#A0A0C5",
+            "axes.spines.top": False,
+            "axes.spines.right": False,
+        }
+        sns.set_style("darkgrid", options)
+        pd.plotting.register_matplotlib_converters()
+        fontprop = font_manager.FontProperties(
+            fname=constants.NOTO_SANS_CJK_REGULAR_FONT_PATH
+        )
+        _configured = True
+
+
+async def warm_up():
+    """Runs `configure_plotting` in a thread, once. Rendering waits for it, so
+    render workers are forked with the plotting libraries already imported.
+    """
+    global _warm_up_future
+    if _warm_up_future is None:
+        loop = asyncio.get_running_loop()
+        _warm_up_future = loop.run_in_executor(None, configure_plotting)
+    await asyncio.shield(_warm_up_future)
 
 
 # String wrapper to avoid the underscore behavior in legends
@@ -26,38 +75,200 @@ class StrWrap:
         return self.string
 
 
-def get_current_figure_as_file():
-    filename = os.path.join(constants.TEMP_DIR, f"tempplot_{time.time()}.png")
-    plt.savefig(
-        filename,
-        facecolor=plt.gca().get_facecolor(),
+def plot_rating_bg(ax, ranks):
+    ymin, ymax = ax.get_ylim()
+    bgcolor = ax.get_facecolor()
+    for rank in ranks:
+        ax.axhspan(
+            rank.low,
+            rank.high,
+            facecolor=rank.color_graph,
+            alpha=0.8,
+            edgecolor=bgcolor,
+            linewidth=0.5,
+        )
+
+    for loc in ax.get_xticks():
+        ax.axvline(loc, color=bgcolor, linewidth=0.5)
+    ax.set_ylim(ymin, ymax)
+
+
+# Discord shows embedded images at most about 400px high, so the default
+# resolution is plenty. zlib levels above 6 cost a lot of time for a few
+# percent smaller files.
+PNG_DPI = 100
+PNG_COMPRESS_LEVEL = 6
+
+# Reused by every render in a worker process, so that saving a figure does
+# not grow a new buffer each time.
+_buffer = io.BytesIO()
+
+
+def _render_png(draw, args, kwargs):
+    """Runs in a worker process. Figures are built with the object-oriented
+    API only, pyplot keeps global state that is not safe to share.
+    """
+    fig = mpl_figure.Figure()
+    draw(fig, *args, **kwargs)
+    facecolor = fig.axes[0].get_facecolor() if fig.axes else "white"
+    _buffer.seek(0)
+    _buffer.truncate()
+    fig.savefig(
+        _buffer,
+        format="png",
+        dpi=PNG_DPI,
+        facecolor=facecolor,
         bbox_inches="tight",
         pad_inches=0.25,
+        pil_kwargs={"compress_level": PNG_COMPRESS_LEVEL},
     )
+    return _buffer.getvalue()
+
+
+# Upper bounds in seconds of the buckets of render time histograms.
+RENDER_TIME_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, float("inf"))
+
 
-    with open(filename, "rb") as file:
-        discord_file = discord.File(
-            io.BytesIO(file.read()), filename="plot.png"
+class RenderPool:
+    """Renders figures in a pool of worker processes, so that rendering does
+    not block the event loop and concurrent plots cannot interfere. At most
+    `workers` figures are rendered at a time, the rest wait in a queue.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.executor = None
+        self.semaphore = None
+        self.queued = 0
+        self.render_time_histograms = defaultdict(
+            lambda: [0] * len(RENDER_TIME_BUCKETS)
         )
 
-    os.remove(filename)
-    return discord_file
+    async def render(self, draw, *args, **kwargs):
+        """Calls `draw(fig, *args, **kwargs)` with a new figure in a worker and
+        returns the figure as PNG bytes. `draw` must be a module level function
+        and all arguments must be picklable.
+        """
+        await warm_up()
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=configure_plotting
+            )
+            self.semaphore = asyncio.Semaphore(self.workers)
+        executor, semaphore = self.executor, self.semaphore
+        self.queued += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self.queued -= 1
+        try:
+            begin = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            png = await loop.run_in_executor(
+                executor, _render_png, draw, args, kwargs
+            )
+            elapsed = time.perf_counter() - begin
+        except BrokenProcessPool:
+            # A worker died and the pool cannot be used again, so the next
+            # render starts a new one.
+            if self.executor is executor:
+                self.executor = self.semaphore = None
+                executor.shutdown(wait=False)
+            raise
+        finally:
+            semaphore.release()
+        bucket = bisect.bisect_left(RENDER_TIME_BUCKETS, elapsed)
+        self.render_time_histograms[draw.__name__][bucket] += 1
+        return png
 
 
-def plot_rating_bg(ranks):
-    ymin, ymax = plt.gca().get_ylim()
-    bgcolor = plt.gca().get_facecolor()
-    for rank in ranks:
-        plt.axhspan(
-            rank.low,
-            rank.high,
-            facecolor=rank.color_graph,
-            alpha=0.8,
-            edgecolor=bgcolor,
-            linewidth=0.5,
+render_pool = RenderPool(workers=2)
+
+
+async def render_as_file(draw, *args, **kwargs):
+    """Renders a figure with the render pool, see `RenderPool.render`."""
+    png = await render_pool.render(draw, *args, **kwargs)
+    return discord.File(io.BytesIO(png), filename="plot.png")
+
+
+class ImageCache:
+    """LRU cache of rendered images, bounded by their total size in bytes.
+    Keys are built by callers from the command, its normalized arguments and
+    the data the image is drawn from. Since images drawn from Codeforces data
+    are keyed by the command alone, the cache is cleared whenever that data is
+    refreshed. This bumps `version`, so that images which were being rendered
+    from the old data at the time are not stored.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.size = 0
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        image = self.entries.get(key)
+        if image is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return image
+
+    def put(self, key, image, version):
+        if version != self.version or len(image) > self.max_size:
+            return
+        self._discard(key)
+        self.entries[key] = image
+        self.size += len(image)
+        while self.size > self.max_size:
+            self._discard(next(iter(self.entries)))
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+        self.version += 1
+
+    def stats(self):
+        return cf.CacheStats(
+            len(self.entries), self.size, self.hits, self.misses
         )
 
-    locs, labels = plt.xticks()
-    for loc in locs:
-        plt.axvline(loc, color=bgcolor, linewidth=0.5)
-    plt.ylim(ymin, ymax)
+    def _discard(self, key):
+        image = self.entries.pop(key, None)
+        if image is not None:
+            self.size -= len(image)
+
+
+IMAGE_CACHE_MAX_SIZE = 32 * 1024 * 1024
+
+image_cache = ImageCache(IMAGE_CACHE_MAX_SIZE)
+
+
+async def cached_image_as_file(key, render, filename="plot.png"):
+    """Returns the image cached under `key` as a `discord.File`. On a miss the
+    image is made by awaiting `render()`, which must return PNG bytes.
+    """
+    version = image_cache.version
+    image = image_cache.get(key)
+    if image is None:
+        image = await render()
+        image_cache.put(key, image, version)
+    return discord.File(io.BytesIO(image), filename=filename)
+
+
+@events.listener(
+    name="ImageCacheContestListener", event_cls=events.ContestListRefresh
+)
+async def on_contest_list_refresh(_):
+    image_cache.clear()
+
+
+@events.listener(
+    name="ImageCacheRatingChangesListener",
+    event_cls=events.RatingChangesUpdate,
+)
+async def on_rating_changes_update(_):
+    image_cache.clear()
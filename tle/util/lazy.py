@@ -0,0 +1,63 @@
+"""Modules imported on first use, to keep heavy dependencies off the startup
+path. `import_module` returns a stand-in for the module which imports it the
+first time one of its attributes is accessed.
+"""
+
+import asyncio
+import importlib
+import logging
+import time
+import types
+
+logger = logging.getLogger(__name__)
+
+_lazy_modules = []
+
+
+class LazyModule(types.ModuleType):
+    def __init__(self, name, before_import):
+        super().__init__(name)
+        self._lazy_before_import = before_import
+        self._lazy_module = None
+
+    def _load(self):
+        if self._lazy_module is None:
+            begin = time.perf_counter()
+            if self._lazy_before_import is not None:
+                self._lazy_before_import()
+            module = importlib.import_module(self.__name__)
+            # Later lookups find the attributes without going through
+            # __getattr__.
+            self.__dict__.update(module.__dict__)
+            self._lazy_module = module
+            elapsed = time.perf_counter() - begin
+            logger.info(f"Imported {self.__name__} in {elapsed:.2f}s")
+        return self._lazy_module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+
+def import_module(name, *, before_import=None):
+    """Returns a stand-in for the module `name`. `before_import` is called
+    right before the module is imported, e.g. to select a version of it.
+    """
+    module = LazyModule(name, before_import)
+    _lazy_modules.append(module)
+    return module
+
+
+def load_all():
+    """Imports all modules that are still waiting for first use."""
+    for module in list(_lazy_modules):
+        try:
+            module._load()
+        except Exception:
+            logger.exception(f"Failed to import {module.__name__}")
+
+
+async def warm_up():
+    """Imports all lazy modules in a thread, so that the first command that
+    needs one does not have to wait for the import.
+    """
+    await asyncio.get_running_loop().run_in_executor(None, load_all)
@@ -1,6 +1,6 @@
 from discord.ext import commands
 
-from tle.util.ranklist.rating_calculator import CodeforcesRatingCalculator
+from tle.util.ranklist.rating_calculator import VectorizedRatingCalculator
 
 
 class RanklistError(commands.CommandError):
@@ -53,6 +53,7 @@ class Ranklist:
         self.delta_by_handle = None
         self.deltas_status = None
         self.changes_by_handle = None
+        self.prediction_input = None
 
     def set_changes(self, changes_by_handle):
         self.changes_by_handle = changes_by_handle
@@ -63,7 +64,11 @@ class Ranklist:
         self.delta_by_handle = delta_by_handle.copy()
         self.deltas_status = "Final"
 
-    def predict(self, current_rating):
+    def predict(self, current_rating, previous=None):
+        """Predicts rating changes. If `previous` is an earlier ranklist of the
+        contest which predicted from the same points, penalties and ratings,
+        its prediction is reused instead of being calculated again.
+        """
         if not self.is_rated:
             raise ContestNotRatedError(self.contest)
         standings = [
@@ -71,8 +76,15 @@ class Ranklist:
             for id_, row in self.standing_by_id.items()
             if id_ in current_rating
         ]
-        if standings:
-            self.delta_by_handle = CodeforcesRatingCalculator(
+        self.prediction_input = standings
+        if (
+            previous is not None
+            and previous.deltas_status == "Predicted"
+            and previous.prediction_input == standings
+        ):
+            self.delta_by_handle = previous.delta_by_handle
+        elif standings:
+            self.delta_by_handle = VectorizedRatingCalculator(
                 standings
             ).calculate_rating_changes()
         self.deltas_status = "Predicted"
@@ -14,6 +14,11 @@ def intdiv(x, y):
     return -(-x // y) if x < 0 else x // y
 
 
+def _intdiv(x, y):
+    """`intdiv` over an array."""
+    return np.where(x < 0, -(-x // y), x // y)
+
+
 @dataclass
 class Contestant:
     party: str
@@ -117,3 +122,88 @@ class CodeforcesRatingCalculator:
         correction = min(0, max(-10, intdiv(delta_sum, zero_sum_count)))
         for contestant in contestants:
             contestant.delta += correction
+
+
+class VectorizedRatingCalculator:
+    def __init__(self, standings):
+        """Calculate the same rating changes as `CodeforcesRatingCalculator`,
+        with every step done on NumPy arrays over all contestants at once.
+        """
+        parties, points, penalties, ratings = zip(*standings)
+        self.parties = list(parties)
+        self.points = np.array(points, dtype=float)
+        self.penalties = np.array(penalties)
+        self.ratings = np.array(ratings, dtype=np.int64)
+        self._precalc_seed()
+        self._reassign_ranks()
+        self._process()
+        self._update_delta()
+
+    def calculate_rating_changes(self):
+        """Return a mapping between contestants and their corresponding delta."""
+        return {
+            self.parties[i]: int(delta)
+            for i, delta in zip(self.order, self.deltas)
+        }
+
+    def get_seeds(self, ratings, me_ratings):
+        """Get seeds given ratings and the ratings of the users themselves."""
+        return self.seed[ratings] - self.elo_win_prob[ratings - me_ratings]
+
+    def _precalc_seed(self):
+        MAX = 6144
+
+        self.elo_win_prob = np.roll(
+            1 / (1 + pow(10, np.arange(-MAX, MAX) / 400)), -MAX
+        )
+        count = np.bincount(self.ratings % (2 * MAX), minlength=2 * MAX)
+        self.seed = 1 + ifft(fft(count) * fft(self.elo_win_prob)).real
+
+    def _reassign_ranks(self):
+        """Find the rank of each contestant, sorting them by rank."""
+        # lexsort is stable, like the sort in CodeforcesRatingCalculator.
+        self.order = np.lexsort((self.penalties, -self.points))
+        points = self.points[self.order]
+        penalties = self.penalties[self.order]
+        # Tied contestants share the rank of the last one among them.
+        is_last = np.ones(len(points), dtype=bool)
+        is_last[:-1] = (points[1:] != points[:-1]) | (
+            penalties[1:] != penalties[:-1]
+        )
+        last_positions = np.flatnonzero(is_last)
+        group = np.concatenate(([0], np.cumsum(is_last[:-1])))
+        self.ranks = (last_positions[group] + 1).astype(float)
+        self.ratings = self.ratings[self.order]
+
+    def _process(self):
+        """Assign approximate delta for each contestant, with all binary
+        searches for performance ratings run in lockstep.
+        """
+        ratings = self.ratings
+        seeds = self.get_seeds(ratings, ratings)
+        mid_ranks = (self.ranks * seeds) ** 0.5
+        left = np.full(len(ratings), 1)
+        right = np.full(len(ratings), 8000)
+        while True:
+            searching = right - left > 1
+            if not searching.any():
+                break
+            mid = (left + right) // 2
+            below = self.get_seeds(mid, ratings) < mid_ranks
+            right = np.where(searching & below, mid, right)
+            left = np.where(searching & ~below, mid, left)
+        self.deltas = _intdiv(left - ratings, 2)
+
+    def _update_delta(self):
+        """Update the delta of each contestant."""
+        n = len(self.deltas)
+
+        by_rating = np.argsort(-self.ratings, kind="stable")
+        self.order = self.order[by_rating]
+        self.ratings = self.ratings[by_rating]
+        self.deltas = self.deltas[by_rating]
+        self.deltas += intdiv(-int(self.deltas.sum()), n) - 1
+
+        zero_sum_count = min(4 * round(n**0.5), n)
+        delta_sum = -int(self.deltas[:zero_sum_count].sum())
+        self.deltas += min(0, max(-10, intdiv(delta_sum, zero_sum_count)))
@@ -0,0 +1,128 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+
+class DeadlineScheduler:
+    """Calls a coroutine function at the deadline of each scheduled entry,
+    from a single task which sleeps until the earliest deadline.
+
+    Entries belong to groups, and are identified by a key within their group.
+    `sync` sets all entries of a group at once, touching only those which
+    changed. Deadlines are kept in a min-heap; entries which are replaced or
+    removed are left in it and skipped once they reach the top.
+    """
+
+    def __init__(self, name, callback):
+        """`callback(group, key, payload)` is awaited at the deadline of each
+        entry."""
+        self.name = name
+        self.callback = callback
+        # group -> key -> (deadline, payload, sequence number)
+        self._entries = {}
+        # (deadline, sequence number, group, key)
+        self._heap = []
+        self._counter = itertools.count()
+        self._wakeup = None
+        self._task = None
+        # Running callbacks, referenced so they are not garbage collected.
+        self._calls = set()
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def pending(self, group=None):
+        """Returns the number of entries waiting for their deadline, in the
+        given group or in all groups."""
+        if group is not None:
+            return len(self._entries.get(group, ()))
+        return sum(map(len, self._entries.values()))
+
+    def groups(self):
+        return set(self._entries)
+
+    def sync(self, group, entries):
+        """Makes `entries`, a dict of key to (deadline, payload), the entries
+        of `group`. Entries whose deadline has passed are dropped. Returns the
+        number of entries added and removed, counting a changed entry as
+        both.
+        """
+        now = time.time()
+        old_entries = self._entries.pop(group, {})
+        new_entries = {}
+        added = 0
+        for key, (deadline, payload) in entries.items():
+            if deadline <= now:
+                continue
+            entry = old_entries.get(key)
+            if entry is None or entry[:2] != (deadline, payload):
+                seq = next(self._counter)
+                entry = deadline, payload, seq
+                heapq.heappush(self._heap, (deadline, seq, group, key))
+                added += 1
+            new_entries[key] = entry
+        if new_entries:
+            self._entries[group] = new_entries
+        removed = len(old_entries) - (len(new_entries) - added)
+        if added:
+            self._start()
+            self._wakeup.set()
+        return added, removed
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _start(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def _is_live(self, item):
+        _, seq, group, key = item
+        entry = self._entries.get(group, {}).get(key)
+        return entry is not None and entry[2] == seq
+
+    def _pop_due(self, now):
+        """Removes and returns the entries whose deadline has come, and the
+        time until the next deadline, or None if there is none."""
+        due = []
+        while self._heap:
+            item = self._heap[0]
+            if not self._is_live(item):
+                heapq.heappop(self._heap)
+                continue
+            deadline, _, group, key = item
+            if deadline > now:
+                return due, deadline - now
+            heapq.heappop(self._heap)
+            group_entries = self._entries[group]
+            _, payload, _ = group_entries.pop(key)
+            if not group_entries:
+                del self._entries[group]
+            due.append((group, key, payload))
+        return due, None
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            due, timeout = self._pop_due(time.time())
+            for group, key, payload in due:
+                call = asyncio.create_task(self._call(group, key, payload))
+                self._calls.add(call)
+                call.add_done_callback(self._calls.discard)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _call(self, group, key, payload):
+        try:
+            await self.callback(group, key, payload)
+        except Exception:
+            self.logger.warning(
+                f"Exception in scheduled call of `{self.name}` for group "
+                f"{group}, key {key}, ignoring.",
+                exc_info=True,
+            )